@@ -0,0 +1,262 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Offline benchmarks for django-constant-contact.
+
+Runs ConstantContact against the mock API server in
+django_constant_contact/mockserver.py, and the rendering pipeline on
+its own, and reports ops/sec and p50/p99 latency for each.
+
+    python benchmarks.py [--iterations 50] [--latency 0.0]
+                         [--json results.json]
+                         [--baseline results.json] [--tolerance 0.25]
+
+With --baseline, exits non-zero if anything is more than --tolerance
+slower (in ops/sec) than it was in the baseline results.  So that a
+baseline made on one machine can gate runs on another, its numbers are
+first scaled by how fast each machine ran a fixed, pure-Python
+calibration workload.  CI compares against benchmark_baseline.json;
+after a change that's meant to be slower (or faster), regenerate it
+with --json, on the Python version CI runs.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import django
+from django.conf import settings
+
+BASE_PATH = os.path.dirname(os.path.abspath(__file__))
+
+CALIBRATION = 'calibration (pure Python)'
+CALIBRATION_ITERATIONS = 50
+
+NEWSLETTER_SECTION = u"""
+<div class="section">
+  <h2 class="headline">Campus Sustainability News {0}</h2>
+  <p class="lede">Students and staff at {0} colleges are working on
+  new ways to cut energy use, waste and water. Here’s what they
+  did this week.</p>
+  <table class="story"><tr>
+    <td class="thumbnail"><img src="https://example.com/{0}.png"></td>
+    <td class="blurb"><a href="https://example.com/{0}">Read more
+    &hellip;</a></td>
+  </tr></table>
+</div>
+"""
+
+NEWSLETTER = u"""<html>
+  <head>
+    <style type="text/css">
+      body {{ width: 100%; font-family: Georgia, serif; }}
+      a {{ text-decoration: none; color: #336699; }}
+      .section {{ padding-top: 5px; border-bottom: 1px solid #ccc; }}
+      .headline {{ font-size: 20px; margin: 0; }}
+      .lede {{ font-size: 14px; line-height: 1.4; }}
+      .story td {{ vertical-align: top; }}
+      .thumbnail img {{ width: 120px; }}
+    </style>
+  </head>
+  <body>{0}</body>
+</html>
+"""
+
+
+def configure():
+    settings.configure(
+        INSTALLED_APPS=(
+            'django.contrib.auth',
+            'django.contrib.contenttypes',
+            'django_constant_contact',
+        ),
+        DATABASES={
+            'default': {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': ':memory:',
+            }
+        },
+        CONSTANT_CONTACT_API_KEY='benchmark',
+        CONSTANT_CONTACT_ACCESS_TOKEN='benchmark',
+        CONSTANT_CONTACT_QUERIES_PER_SECOND=None,
+        CONSTANT_CONTACT_RENDER_CACHE_SIZE=0,
+        CONSTANT_CONTACT_PREVIEW_CACHE=None,
+        SECRET_KEY='benchmark')
+    django.setup()
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+
+
+def percentile(durations, fraction):
+    durations = sorted(durations)
+    return durations[int(round((len(durations) - 1) * fraction))]
+
+
+def measure(name, func, iterations, ops_per_call=1):
+    """Calls func() `iterations` times; returns a dict of stats."""
+    durations = []
+    for i in range(iterations):
+        start = time.time()
+        func(i)
+        durations.append(time.time() - start)
+    total = sum(durations)
+    result = {
+        'name': name,
+        'ops_per_sec': (iterations * ops_per_call) / total if total else 0,
+        'min_ms': min(durations) * 1000,
+        'p50_ms': percentile(durations, 0.5) * 1000,
+        'p99_ms': percentile(durations, 0.99) * 1000,
+    }
+    print('{name:<40} {ops_per_sec:>10.1f} ops/s '
+          '{p50_ms:>9.2f} ms p50 {p99_ms:>9.2f} ms p99'.format(**result))
+    return result
+
+
+def calibration_workload(i):
+    """A fixed mix of the interpreter work the client does: string
+    building, dict churn and JSON.
+    """
+    items = [{'id': str(j), 'name': u'Campaign {0}'.format(j)}
+             for j in range(2000)]
+    json.loads(json.dumps(items))
+    ''.join(item['name'] for item in items)
+
+
+def run(iterations, latency):
+    from django.test.utils import override_settings
+
+    from django_constant_contact import rendering
+    from django_constant_contact.mockserver import MockConstantContactServer
+    from django_constant_contact.models import ConstantContact
+
+    newsletter = NEWSLETTER.format(
+        ''.join(NEWSLETTER_SECTION.format(i) for i in range(100)))
+    campaign_kwargs = {
+        'name': 'Benchmark Campaign',
+        'email_content': newsletter,
+        'from_email': 'from@example.com',
+        'from_name': 'Benchmark',
+        'reply_to_email': 'reply@example.com',
+        'subject': 'Benchmark',
+        'text_content': 'Benchmark',
+        'address': {
+            'organization_name': 'My Organization',
+            'address_line_1': '123 Maple Street',
+            'address_line_2': '',
+            'address_line_3': '',
+            'city': 'Anytown',
+            'state': 'MA',
+            'international_state': '',
+            'postal_code': '01444',
+            'country': 'US'}}
+
+    def unique_kwargs(i):
+        return dict(campaign_kwargs, name='Benchmark Campaign {0}'.format(i))
+
+    results = [measure(CALIBRATION, calibration_workload,
+                       CALIBRATION_ITERATIONS)]
+    results.append(measure(
+        'render_email_content ({0} KB)'.format(len(newsletter) // 1024),
+        lambda i: rendering.render_email_content(newsletter), iterations))
+
+    with override_settings(CONSTANT_CONTACT_RENDER_CACHE_SIZE=1024 * 1024):
+        rendering.reset_render_cache()
+        rendering.render(newsletter)
+        results.append(measure('render (cached)',
+                               lambda i: rendering.render(newsletter),
+                               iterations))
+    rendering.reset_render_cache()
+
+    with MockConstantContactServer(latency=latency) as server:
+        with override_settings(CONSTANT_CONTACT_API_URL=server.url):
+            cc = ConstantContact()
+            campaigns = []
+            results.append(measure(
+                'new_email_marketing_campaign',
+                lambda i: campaigns.append(
+                    cc.new_email_marketing_campaign(**unique_kwargs(i))),
+                iterations))
+            results.append(measure(
+                'update_email_marketing_campaign',
+                lambda i: cc.update_email_marketing_campaign(
+                    campaigns[i], force=True, **unique_kwargs(i)),
+                iterations))
+            results.append(measure(
+                'preview_email_marketing_campaign',
+                lambda i: cc.preview_email_marketing_campaign(
+                    campaigns[i], use_cache=False),
+                iterations))
+            results.append(measure(
+                'delete_email_marketing_campaign',
+                lambda i: cc.delete_email_marketing_campaign(campaigns[i]),
+                iterations))
+
+            batch_size = 10
+            results.append(measure(
+                'bulk_create_campaigns (per campaign)',
+                lambda i: cc.bulk_create_campaigns(
+                    [unique_kwargs(i * batch_size + j)
+                     for j in range(batch_size)]),
+                max(1, iterations // batch_size),
+                ops_per_call=batch_size))
+    return results
+
+
+def regressions(results, baseline, tolerance):
+    """Returns a line for each of `results` that's more than
+    `tolerance` slower than in `baseline`, scaled by the two runs'
+    calibration speeds.
+    """
+    baseline = dict((result['name'], result) for result in baseline)
+    results = dict((result['name'], result) for result in results)
+    scale = 1.0
+    if CALIBRATION in baseline and CALIBRATION in results:
+        # The fastest run is the steadiest measure of a machine's speed.
+        scale = (baseline[CALIBRATION]['min_ms'] /
+                 results[CALIBRATION]['min_ms'])
+    slower = []
+    for name, result in sorted(results.items()):
+        before = baseline.get(name)
+        if name == CALIBRATION or not before:
+            continue
+        expected = before['ops_per_sec'] * scale
+        if result['ops_per_sec'] < expected * (1 - tolerance):
+            slower.append('{0}: {1:.1f} ops/s, expected {2:.1f}'.format(
+                name, result['ops_per_sec'], expected))
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split(
+        '\n')[0])
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='Seconds the mock server waits per request.')
+    parser.add_argument('--json', help='Write results to this file.')
+    parser.add_argument('--baseline',
+                        help='Compare against results in this file.')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    args = parser.parse_args()
+
+    sys.path.insert(0, BASE_PATH)
+    configure()
+    results = run(args.iterations, args.latency)
+
+    if args.json:
+        with open(args.json, 'w') as results_file:
+            json.dump(results, results_file, indent=2, sort_keys=True,
+                      separators=(',', ': '))
+            results_file.write('\n')
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            slower = regressions(results, json.load(baseline_file),
+                                 args.tolerance)
+        for line in slower:
+            print('REGRESSION ' + line)
+        sys.exit(1 if slower else 0)
+
+
+if __name__ == '__main__':
+    main()
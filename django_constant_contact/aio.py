@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+"""An asyncio flavor of ConstantContact.
+
+Requires Python 3.5+ and aiohttp (`pip install
+django-constant-contact[async]`), so it isn't imported by anything
+else in this package.
+
+    cc = AsyncConstantContact()
+    try:
+        campaigns = await asyncio.gather(
+            *[cc.new_email_marketing_campaign(**kwargs)
+              for kwargs in all_the_kwargs])
+    finally:
+        await cc.close()
+
+HTTP requests run on aiohttp; CSS inlining and minification, and all
+ORM reads and writes, run in an executor so they don't block the
+event loop.
+"""
+import asyncio
+import functools
+
+import aiohttp
+from django.conf import settings
+from django.db import close_old_connections
+
+from . import instrumentation, serialization
+from .circuitbreaker import get_circuit_breaker, is_failure
+from .models import (ConstantContact,
+                     ConstantContactAPIError,
+                     EmailMarketingCampaign,
+                     payload_fingerprint,
+                     trim_content)
+from .ratelimit import get_rate_limiter, retry_delay
+from .transport import DEFAULT_POOL_SIZE, get_timeout, gzip_body
+
+
+class AsyncResponse(object):
+    """The bits of an aiohttp response we need after it's been read.
+
+    Quacks enough like a requests.Response for ConstantContactAPIError.
+    """
+
+    def __init__(self, status_code, reason, content):
+        self.status_code = status_code
+        self.reason = reason
+        self.content = content
+
+    def json(self):
+        return serialization.loads(self.content)
+
+
+class AsyncConstantContact(object):
+
+    API_URL = ConstantContact.API_URL
+    EMAIL_MARKETING_CAMPAIGN_URL = ConstantContact.EMAIL_MARKETING_CAMPAIGN_URL
+
+    def __init__(self, session=None, executor=None):
+        """`session` is an aiohttp.ClientSession; if None, one is
+        created (with a connection pool sized by
+        CONSTANT_CONTACT_POOL_SIZE) on first use, and closed by close().
+
+        `executor` runs the blocking work (rendering, ORM); None
+        means the event loop's default executor.
+        """
+        self._session = session
+        self._owns_session = session is None
+        self.executor = executor
+        self.api_url = getattr(settings, 'CONSTANT_CONTACT_API_URL',
+                               self.API_URL)
+        # aiohttp refuses None query values; requests leaves them out.
+        self.params = dict(
+            (name, value) for name, value in (
+                ('api_key', settings.CONSTANT_CONTACT_API_KEY),
+                ('access_token', settings.CONSTANT_CONTACT_ACCESS_TOKEN))
+            if value is not None)
+        # For the (synchronous) payload building and rendering.
+        self.sync_client = ConstantContact()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        """Closes the aiohttp session, if we made it."""
+        if self._owns_session and self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    @property
+    def session(self):
+        if self._session is None:
+            pool_size = getattr(settings, 'CONSTANT_CONTACT_POOL_SIZE',
+                                DEFAULT_POOL_SIZE)
+            keep_alive = getattr(settings, 'CONSTANT_CONTACT_KEEP_ALIVE',
+                                 True)
+            connector = aiohttp.TCPConnector(limit=pool_size,
+                                             force_close=not keep_alive)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=self.client_timeout())
+        return self._session
+
+    def client_timeout(self):
+        """Translates CONSTANT_CONTACT_TIMEOUT for aiohttp."""
+        timeout = get_timeout()
+        if timeout is None:
+            return aiohttp.ClientTimeout(total=None)
+        if isinstance(timeout, (tuple, list)):
+            connect, read = timeout
+            return aiohttp.ClientTimeout(sock_connect=connect, sock_read=read)
+        return aiohttp.ClientTimeout(sock_connect=timeout, sock_read=timeout)
+
+    async def run_sync(self, func, *args, **kwargs):
+        """Runs blocking func in self.executor."""
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            self.executor, functools.partial(func, *args, **kwargs))
+
+    async def run_orm(self, func, *args, **kwargs):
+        """Like run_sync(), but tidies up the worker thread's DB
+        connection the way Django does at the end of a request.
+        """
+        def call():
+            close_old_connections()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                close_old_connections()
+        return await self.run_sync(call)
+
+    async def throttle(self):
+        """Waits, without blocking the loop, for the rate limiter."""
+        rate_limiter = get_rate_limiter()
+        while rate_limiter:
+            wait = rate_limiter.reserve()
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+    async def request(self, method, relative_url, **kwargs):
+        """Makes a request; returns an AsyncResponse.
+
+        Requests are rate limited, retried, failed fast and gzipped
+        like ConstantContact's (see ratelimit.py, circuitbreaker.py and
+        transport.py).  Raises ConstantContactAPIError for 4xx and 5xx
+        responses.
+        """
+        gzipped = gzip_body(kwargs.get('data'))
+        if gzipped is not None:
+            kwargs['data'] = gzipped
+            kwargs['headers'] = dict(kwargs.get('headers') or {},
+                                     **{'Content-Encoding': 'gzip'})
+        endpoint = instrumentation.endpoint(relative_url)
+        circuit_breaker = get_circuit_breaker()
+        attempt = 0
+        while True:
+            if circuit_breaker:
+                circuit_breaker.allow(endpoint)
+            # CancelledError isn't an Exception on Python 3.8+.
+            recorded = False
+            try:
+                await self.throttle()
+                with instrumentation.timed(
+                        'http', method=method, endpoint=endpoint,
+                        request_bytes=len(kwargs.get('data') or '')) as tags:
+                    try:
+                        async with self.session.request(
+                                method, self.api_url + relative_url,
+                                params=self.params, **kwargs) as response:
+                            content = await response.read()
+                    except Exception:
+                        recorded = True
+                        if circuit_breaker:
+                            circuit_breaker.record(endpoint, failed=True)
+                        raise
+                    recorded = True
+                    if circuit_breaker:
+                        circuit_breaker.record(
+                            endpoint, failed=is_failure(response.status))
+                    tags['status_code'] = response.status
+                    tags['response_bytes'] = len(content)
+            finally:
+                if circuit_breaker and not recorded:
+                    circuit_breaker.release(endpoint)
+            delay = retry_delay(method, response.status, response.headers,
+                                attempt)
+            if delay is None:
+                break
+            await asyncio.sleep(delay)
+            attempt += 1
+        response = AsyncResponse(response.status, response.reason, content)
+        if 400 <= response.status_code <= 599:
+            raise ConstantContactAPIError(response)
+        return response
+
+    def campaign_url(self, email_marketing_campaign, *parts):
+        return '/'.join(
+            [self.EMAIL_MARKETING_CAMPAIGN_URL,
+             str(email_marketing_campaign.constant_contact_id)] + list(parts))
+
+    async def new_email_marketing_campaign(self, include_content=True,
+                                           **kwargs):
+        """Create a Constant Contact email marketing campaign.
+        Takes the same arguments as
+        ConstantContact.new_email_marketing_campaign(), but for
+        `idempotency_key`.
+        Returns an EmailMarketingCampaign object.
+        """
+        data = await self.run_sync(
+            self.sync_client.email_marketing_campaign_data, **kwargs)
+
+        response = await self.request(
+            'POST', self.EMAIL_MARKETING_CAMPAIGN_URL,
+            data=serialization.dumps(data),
+            headers={'content-type': 'application/json'})
+
+        response_data = response.json()
+        if not include_content:
+            response_data = trim_content(response_data)
+        return await self.run_orm(
+            EmailMarketingCampaign.objects.create,
+            data=response_data,
+            payload_fingerprint=payload_fingerprint(data))
+
+    async def update_email_marketing_campaign(self, email_marketing_campaign,
+                                              force=False,
+                                              include_content=True,
+                                              **kwargs):
+        """Update a Constant Contact email marketing campaign.
+        Takes the same arguments as
+        ConstantContact.update_email_marketing_campaign().
+        Returns the updated EmailMarketingCampaign object.
+        """
+        data = await self.run_sync(
+            self.sync_client.email_marketing_campaign_data, **kwargs)
+        fingerprint = payload_fingerprint(data)
+        if (not force and
+                fingerprint == email_marketing_campaign.payload_fingerprint):
+            return email_marketing_campaign
+
+        response = await self.request(
+            'PUT', self.campaign_url(email_marketing_campaign),
+            data=serialization.dumps(data),
+            headers={'content-type': 'application/json'})
+
+        email_marketing_campaign.data = response.json()
+        if not include_content:
+            email_marketing_campaign.data = trim_content(
+                email_marketing_campaign.data)
+        email_marketing_campaign.payload_fingerprint = fingerprint
+        await self.run_orm(email_marketing_campaign.save)
+        if not include_content:
+            await self.run_orm(EmailMarketingCampaign.delete_content,
+                               [email_marketing_campaign])
+        await self.run_sync(self.sync_client.invalidate_preview,
+                            email_marketing_campaign)
+
+        return email_marketing_campaign
+
+    async def delete_email_marketing_campaign(self, email_marketing_campaign):
+        """Deletes a Constant Contact email marketing campaign.
+        """
+        response = await self.request(
+            'DELETE', self.campaign_url(email_marketing_campaign))
+        await self.run_sync(self.sync_client.invalidate_preview,
+                            email_marketing_campaign)
+        return response
+
+    async def preview_email_marketing_campaign(self, email_marketing_campaign,
+                                               use_cache=True):
+        """Returns HTML and text previews of an EmailMarketingCampaign.
+
+        Uses the same cache as ConstantContact.
+        """
+        if use_cache:
+            preview = await self.run_sync(
+                self.sync_client.get_cached_preview, email_marketing_campaign)
+            if preview is not None:
+                return preview
+
+        response = await self.request(
+            'GET', self.campaign_url(email_marketing_campaign, 'preview'))
+        data = response.json()
+        preview = (data['preview_email_content'],
+                   data['preview_text_content'])
+
+        if use_cache:
+            await self.run_sync(self.sync_client.set_cached_preview,
+                                email_marketing_campaign, preview)
+        return preview
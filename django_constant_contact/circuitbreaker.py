@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""Failing fast while the Constant Contact API is down.
+
+When the API degrades, every call would otherwise wait out the full
+timeout (and its retries), tying up the threads that made it.  A
+circuit breaker tracks the outcome of requests to each endpoint (see
+instrumentation.endpoint()) over a rolling window.  Once enough of
+them fail (5xxs, timeouts, connection errors), the endpoint's circuit
+opens, and requests to it raise CircuitOpenError at once, without
+calling the API.  After a while the circuit goes half-open: a few
+trial requests are let through, and the first to succeed closes the
+circuit again; a failure reopens it.  A trial that ends without an
+outcome (cancelled, interrupted) is released, so another can be made.
+
+Settings (all optional):
+
+    CONSTANT_CONTACT_CIRCUIT_FAILURE_RATE
+                                         Fraction of requests that must
+                                         fail to open a circuit
+                                         (default 0.5).  None or 0
+                                         turns the breaker off.
+    CONSTANT_CONTACT_CIRCUIT_MIN_REQUESTS
+                                         Requests in the window before
+                                         a circuit can open (default 10).
+    CONSTANT_CONTACT_CIRCUIT_WINDOW      Seconds of outcomes counted
+                                         (default 30).
+    CONSTANT_CONTACT_CIRCUIT_RESET_TIMEOUT
+                                         Seconds a circuit stays open
+                                         before trial requests (default
+                                         30).
+    CONSTANT_CONTACT_CIRCUIT_HALF_OPEN_REQUESTS
+                                         Trial requests let through at
+                                         once (default 1).
+"""
+import threading
+from collections import deque
+
+import requests
+from django.conf import settings
+
+from .ratelimit import monotonic
+from .singleton import ProcessSingleton
+
+DEFAULT_FAILURE_RATE = 0.5
+DEFAULT_MIN_REQUESTS = 10
+DEFAULT_WINDOW = 30
+DEFAULT_RESET_TIMEOUT = 30
+DEFAULT_HALF_OPEN_REQUESTS = 1
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+
+class CircuitOpenError(requests.RequestException):
+    """Raised, instead of making a request, while the circuit for its
+    endpoint is open.
+
+    `retry_after` is roughly how many seconds until a trial request
+    will be let through.  A RequestException, so bulk operations
+    return it as a result, and job runners retry later.
+    """
+
+    def __init__(self, endpoint, retry_after=0):
+        super(CircuitOpenError, self).__init__(
+            'Circuit open for {0}; retry in {1:.0f}s.'.format(
+                endpoint, retry_after))
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+
+
+class Circuit(object):
+    """The state of one endpoint's circuit."""
+
+    def __init__(self):
+        self.state = CLOSED
+        # (time, failed) for each request in the window.
+        self.outcomes = deque()
+        self.failures = 0
+        self.opened = None
+        self.trials = 0
+
+
+class CircuitBreaker(object):
+    """Circuits for every endpoint, shared by all threads in this
+    process.  See the module docstring.
+    """
+
+    def __init__(self, failure_rate=DEFAULT_FAILURE_RATE,
+                 min_requests=DEFAULT_MIN_REQUESTS, window=DEFAULT_WINDOW,
+                 reset_timeout=DEFAULT_RESET_TIMEOUT,
+                 half_open_requests=DEFAULT_HALF_OPEN_REQUESTS):
+        self.failure_rate = failure_rate
+        self.min_requests = min_requests
+        self.window = window
+        self.reset_timeout = reset_timeout
+        self.half_open_requests = half_open_requests
+        self.circuits = {}
+        self.lock = threading.Lock()
+
+    def state(self, endpoint):
+        """Returns the state of `endpoint`'s circuit."""
+        circuit = self.circuits.get(endpoint)
+        return circuit.state if circuit else CLOSED
+
+    def allow(self, endpoint):
+        """Call before each request to `endpoint`.  Raises
+        CircuitOpenError if it should fail fast.
+        """
+        with self.lock:
+            circuit = self.circuits.get(endpoint)
+            if circuit is None or circuit.state == CLOSED:
+                return
+            if circuit.state == OPEN:
+                retry_after = circuit.opened + self.reset_timeout - monotonic()
+                if retry_after > 0:
+                    raise CircuitOpenError(endpoint, retry_after)
+                circuit.state = HALF_OPEN
+                circuit.trials = 0
+            if circuit.trials >= self.half_open_requests:
+                raise CircuitOpenError(endpoint)
+            circuit.trials += 1
+
+    def record(self, endpoint, failed):
+        """Call after each request to `endpoint` that allow() let
+        through, with whether it failed.
+        """
+        with self.lock:
+            circuit = self.circuits.setdefault(endpoint, Circuit())
+            now = monotonic()
+            if circuit.state == HALF_OPEN:
+                if failed:
+                    self.open(circuit, now)
+                else:
+                    circuit.state = CLOSED
+                return
+            if circuit.state == OPEN:
+                # Sent before the circuit opened.
+                return
+
+            circuit.outcomes.append((now, failed))
+            circuit.failures += failed
+            while circuit.outcomes and (
+                    circuit.outcomes[0][0] <= now - self.window):
+                circuit.failures -= circuit.outcomes.popleft()[1]
+            if (len(circuit.outcomes) >= self.min_requests and
+                    circuit.failures >=
+                    self.failure_rate * len(circuit.outcomes)):
+                self.open(circuit, now)
+
+    def release(self, endpoint):
+        """Call instead of record() when a request to `endpoint` that
+        allow() let through ends without an outcome (it was cancelled,
+        interrupted, or never sent), so a half-open circuit can let
+        another trial through.
+        """
+        with self.lock:
+            circuit = self.circuits.get(endpoint)
+            if circuit and circuit.state == HALF_OPEN and circuit.trials:
+                circuit.trials -= 1
+
+    def open(self, circuit, now):
+        circuit.state = OPEN
+        circuit.opened = now
+        circuit.outcomes.clear()
+        circuit.failures = 0
+
+
+def is_failure(status_code):
+    """Does a response with `status_code` count against its circuit?
+
+    4xxs (including 429s) are the client's doing, not an outage.
+    """
+    return status_code >= 500
+
+
+def build_circuit_breaker():
+    """Returns a new CircuitBreaker configured from settings, or None
+    if the breaker is off.
+    """
+    failure_rate = getattr(settings, 'CONSTANT_CONTACT_CIRCUIT_FAILURE_RATE',
+                           DEFAULT_FAILURE_RATE)
+    if not failure_rate:
+        return None
+    return CircuitBreaker(
+        failure_rate=failure_rate,
+        min_requests=getattr(settings,
+                             'CONSTANT_CONTACT_CIRCUIT_MIN_REQUESTS',
+                             DEFAULT_MIN_REQUESTS),
+        window=getattr(settings, 'CONSTANT_CONTACT_CIRCUIT_WINDOW',
+                       DEFAULT_WINDOW),
+        reset_timeout=getattr(settings,
+                              'CONSTANT_CONTACT_CIRCUIT_RESET_TIMEOUT',
+                              DEFAULT_RESET_TIMEOUT),
+        half_open_requests=getattr(
+            settings, 'CONSTANT_CONTACT_CIRCUIT_HALF_OPEN_REQUESTS',
+            DEFAULT_HALF_OPEN_REQUESTS))
+
+
+# Resetting it forgets the state of its circuits, too.
+_circuit_breaker = ProcessSingleton(build_circuit_breaker)
+get_circuit_breaker = _circuit_breaker.get
+reset_circuit_breaker = _circuit_breaker.reset
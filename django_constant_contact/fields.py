@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""Model fields.
+
+CompressedJSONField is a JSONField that stores its JSON
+zlib-compressed (and base64-encoded, so the column stays text) when
+settings.CONSTANT_CONTACT_COMPRESS_DATA is True.  Rendered email
+content, which most of a campaign's JSON is, compresses well.
+
+Compressed and uncompressed values can share a column; each is read
+back correctly whatever the setting, so it can be turned on (or off)
+at any time.  rewrite() converts rows saved under the old setting.
+"""
+import base64
+import zlib
+
+import jsonfield
+from django.conf import settings
+
+try:
+    string_types = basestring  # Python 2
+except NameError:
+    string_types = str
+
+# Compressed values start with this; JSON can't.
+PREFIX = 'zlib:'
+
+# Values shorter than this aren't worth compressing.
+MIN_COMPRESS_LENGTH = 512
+
+
+def compress(value):
+    """Returns `value` (a JSON string) compressed, if it's long enough
+    and settings say so.
+    """
+    if (not isinstance(value, string_types) or
+            len(value) < MIN_COMPRESS_LENGTH or
+            not getattr(settings, 'CONSTANT_CONTACT_COMPRESS_DATA', False)):
+        return value
+    compressed = zlib.compress(value.encode('utf-8'))
+    return PREFIX + base64.b64encode(compressed).decode('ascii')
+
+
+def decompress(value):
+    """Returns `value` decompressed, if it was compressed."""
+    if isinstance(value, string_types) and value.startswith(PREFIX):
+        compressed = base64.b64decode(value[len(PREFIX):])
+        return zlib.decompress(compressed).decode('utf-8')
+    return value
+
+
+class CompressedJSONField(jsonfield.JSONField):
+    """A JSONField that's stored compressed; see the module docstring.
+    """
+
+    def pre_init(self, value, obj):
+        # jsonfield < 3 decodes values from the database here.
+        return super(CompressedJSONField, self).pre_init(decompress(value),
+                                                         obj)
+
+    def from_db_value(self, value, *args, **kwargs):
+        # jsonfield >= 3 decodes them here.
+        value = decompress(value)
+        from_db_value = getattr(super(CompressedJSONField, self),
+                                'from_db_value', None)
+        if from_db_value is None:
+            return value
+        return from_db_value(value, *args, **kwargs)
+
+    def get_prep_value(self, value):
+        return compress(
+            super(CompressedJSONField, self).get_prep_value(value))
+
+
+def rewrite(queryset, field_name='data'):
+    """Saves `field_name` again for each row in `queryset`, so it's
+    stored compressed, or not, as settings now say.  Returns the
+    number of rows saved.
+    """
+    count = 0
+    for obj in queryset.only('pk', field_name).iterator():
+        queryset.model._default_manager.filter(pk=obj.pk).update(
+            **{field_name: getattr(obj, field_name)})
+        count += 1
+    return count
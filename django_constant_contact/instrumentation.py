@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""Timings for the slow parts of talking to Constant Contact.
+
+Each phase of a call -- `inline` (CSS), `minify`, `sanitize` (the
+work-around), `render` (all three, when done in a process pool),
+`serialize` (the JSON payload), `http`, `parse` (the JSON response)
+and `db` -- is timed, and reported two ways:
+
+  - the `phase_timed` signal, sent with `phase`, `duration` (seconds)
+    and `tags` (a dict) keyword arguments, and
+  - settings.CONSTANT_CONTACT_METRICS_CALLBACK, if set: a callable, or
+    a dotted path to one, called as callback(phase, duration, **tags).
+
+`http` tags include `method`, `endpoint`, `status_code`,
+`request_bytes` and `response_bytes`.  For example, to feed StatsD:
+
+    def record(phase, duration, **tags):
+        statsd.timing('constant_contact.' + phase, duration * 1000)
+
+Nothing is timed unless someone's listening.
+"""
+import re
+import time
+from contextlib import contextmanager
+
+from django.dispatch import Signal
+from django.utils.module_loading import import_string
+
+from .singleton import setting
+
+try:
+    string_types = basestring  # Python 2
+except NameError:
+    string_types = str
+
+# Sent with phase, duration and tags.
+phase_timed = Signal()
+
+_ID_SEGMENT = re.compile(r'/\d+(?=/|$)')
+
+
+def get_metrics_callback():
+    """Returns settings.CONSTANT_CONTACT_METRICS_CALLBACK, or None."""
+    callback = setting('CONSTANT_CONTACT_METRICS_CALLBACK')
+    if isinstance(callback, string_types):
+        callback = import_string(callback)
+    return callback
+
+
+def is_enabled():
+    """Is anyone listening?"""
+    return bool(phase_timed.has_listeners() or get_metrics_callback())
+
+
+def emit(phase, duration, **tags):
+    """Reports that `phase` took `duration` seconds."""
+    phase_timed.send(sender=phase, phase=phase, duration=duration,
+                     tags=tags)
+    callback = get_metrics_callback()
+    if callback:
+        callback(phase, duration, **tags)
+
+
+@contextmanager
+def timed(phase, **tags):
+    """Times the body of a with statement as `phase`.
+
+    Yields the tags dict, so the body can add to it (status codes,
+    byte counts, ...).
+    """
+    if not is_enabled():
+        yield tags
+        return
+    start = time.time()
+    try:
+        yield tags
+    finally:
+        emit(phase, time.time() - start, **tags)
+
+
+def endpoint(url):
+    """Returns the API endpoint for `url`, with IDs replaced by {id},
+    so metrics can be grouped by endpoint.
+    """
+    path = url.split('?', 1)[0]
+    path = path.split('/v2/', 1)[-1]
+    return _ID_SEGMENT.sub('/{id}', '/' + path).lstrip('/')
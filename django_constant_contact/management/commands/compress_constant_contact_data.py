@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from ...fields import rewrite
+from ...models import EmailMarketingCampaign, EmailMarketingCampaignContent
+
+
+class Command(BaseCommand):
+    help = ("Save email marketing campaign data again, compressed or not "
+            "as CONSTANT_CONTACT_COMPRESS_DATA says.")
+
+    def handle(self, *args, **options):
+        count = (rewrite(EmailMarketingCampaign.objects.all()) +
+                 rewrite(EmailMarketingCampaignContent.objects.all()))
+        self.stdout.write('Saved {0} rows.'.format(count))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from ...models import ConstantContact
+
+
+class Command(BaseCommand):
+    help = ("Delete the email marketing campaigns queued for deletion "
+            "(see CONSTANT_CONTACT_DEFER_DELETES) from Constant Contact.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-workers', type=int, default=None,
+                            help='Deletions made at once.')
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help='Deletions fetched from the queue at once.')
+        parser.add_argument('--max-attempts', type=int, default=5,
+                            help='Give up on a deletion after this many '
+                            'failures.')
+
+    def handle(self, *args, **options):
+        deleted, failed = ConstantContact().process_remote_deletions(
+            max_workers=options['max_workers'],
+            batch_size=options['batch_size'],
+            max_attempts=options['max_attempts'])
+        self.stdout.write(
+            'Deleted {0} email marketing campaigns; {1} failed.'.format(
+                deleted, failed))
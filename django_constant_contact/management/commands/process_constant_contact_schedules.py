@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from ...models import ConstantContact
+
+
+class Command(BaseCommand):
+    help = ("Schedule the email marketing campaigns queued for scheduling "
+            "at Constant Contact.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-workers', type=int, default=None,
+                            help='Schedules made at once.')
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help='Schedules fetched from the queue at once.')
+        parser.add_argument('--max-attempts', type=int, default=5,
+                            help='Give up on a schedule after this many '
+                            'failures.')
+
+    def handle(self, *args, **options):
+        scheduled, failed = ConstantContact().process_schedules(
+            max_workers=options['max_workers'],
+            batch_size=options['batch_size'],
+            max_attempts=options['max_attempts'])
+        self.stdout.write(
+            'Scheduled {0} email marketing campaigns; {1} failed.'.format(
+                scheduled, failed))
@@ -0,0 +1,40 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+
+from ...models import ConstantContact
+
+
+class Command(BaseCommand):
+    help = ("Settle interrupted email marketing campaign creates, and find "
+            "possible duplicate campaigns at Constant Contact.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, default=10,
+                            help='Settle pending creates at least this many '
+                            'minutes old.')
+        parser.add_argument('--delete', type=int, action='append',
+                            default=[], metavar='CAMPAIGN_ID',
+                            help='Delete this campaign (a duplicate found by '
+                            'an earlier run) from Constant Contact.  May be '
+                            'given more than once.')
+        parser.add_argument('--max-workers', type=int, default=None,
+                            help='Deletes made at once.')
+
+    def handle(self, *args, **options):
+        constant_contact = ConstantContact()
+        adopted, failed, duplicates = constant_contact.reconcile_campaigns(
+            older_than=datetime.timedelta(minutes=options['older_than']))
+        self.stdout.write(
+            'Adopted {0} email marketing campaigns; {1} failed.'.format(
+                adopted, failed))
+        for constant_contact_id, key in sorted(duplicates.items()):
+            self.stdout.write(
+                'Campaign {0} may duplicate the one created under key {1}; '
+                'check it, then pass --delete {0} to delete it.'.format(
+                    constant_contact_id, key))
+        if options['delete']:
+            deleted = constant_contact.delete_duplicate_campaigns(
+                options['delete'], max_workers=options['max_workers'])
+            self.stdout.write(
+                'Deleted {0} email marketing campaigns.'.format(deleted))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from ...models import ConstantContact
+
+
+class Command(BaseCommand):
+    help = ("Pull email marketing campaigns modified since the last sync "
+            "from Constant Contact into EmailMarketingCampaigns.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', default=False,
+                            help='Sync every campaign, not just the ones '
+                            'modified since the last sync.')
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help='Campaigns saved per batch.')
+
+    def handle(self, *args, **options):
+        count = ConstantContact().sync_campaigns(
+            full=options['full'], batch_size=options['batch_size'])
+        self.stdout.write('Synced {0} email marketing campaigns.'.format(
+            count))
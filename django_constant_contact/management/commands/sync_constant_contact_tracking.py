@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from ...models import ConstantContact, EmailMarketingCampaign
+
+
+class Command(BaseCommand):
+    help = ("Pull tracking activity (sends, opens, clicks, ...) for email "
+            "marketing campaigns from Constant Contact.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--campaign', type=int, action='append',
+                            dest='campaigns', default=[],
+                            help='Constant Contact ID of a campaign to sync '
+                            '(repeatable). Default: every campaign with '
+                            '--status.')
+        parser.add_argument('--status', default='SENT',
+                            help='Sync campaigns with this status.')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Events saved at once.')
+
+    def handle(self, *args, **options):
+        if options['campaigns']:
+            campaigns = EmailMarketingCampaign.objects.filter(
+                constant_contact_id__in=options['campaigns'])
+        else:
+            campaigns = EmailMarketingCampaign.objects.filter(
+                status=options['status'])
+        cc = ConstantContact()
+        count = 0
+        for email_marketing_campaign in campaigns.only(
+                'pk', 'constant_contact_id').iterator():
+            count += cc.sync_tracking(email_marketing_campaign,
+                                      batch_size=options['batch_size'])
+        self.stdout.write('Synced {0} tracking events.'.format(count))
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_constant_contact', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='emailmarketingcampaign',
+            name='payload_fingerprint',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
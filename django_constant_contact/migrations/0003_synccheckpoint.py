@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_constant_contact',
+         '0002_emailmarketingcampaign_payload_fingerprint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncCheckpoint',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('key', models.CharField(max_length=255, unique=True)),
+                ('value', models.TextField(blank=True, default='')),
+                ('modified', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import dateparse, timezone
+from django.utils.timezone import utc
+
+
+# Frozen copies of models.parse_timestamp() and models.data_fields(),
+# as they were when this migration was written.
+
+def parse_timestamp(timestamp):
+    if not timestamp:
+        return None
+    timestamp = dateparse.parse_datetime(timestamp)
+    if timestamp is None:
+        return None
+    if timezone.is_naive(timestamp):
+        timestamp = timestamp.replace(tzinfo=utc)
+    if not settings.USE_TZ:
+        timestamp = timezone.make_naive(timestamp,
+                                        timezone.get_default_timezone())
+    return timestamp
+
+
+def data_fields(data):
+    return {
+        'name': (data.get('name') or '')[:255],
+        'status': (data.get('status') or '')[:20],
+        'modified_date': parse_timestamp(data.get('modified_date')),
+        'last_run_date': parse_timestamp(data.get('last_run_date')),
+    }
+
+
+def copy_data_fields(apps, schema_editor):
+    """Fills in the new columns for existing EmailMarketingCampaigns.
+    """
+    EmailMarketingCampaign = apps.get_model('django_constant_contact',
+                                            'EmailMarketingCampaign')
+    campaigns = EmailMarketingCampaign.objects.only('pk', 'data')
+    for email_marketing_campaign in campaigns.iterator():
+        EmailMarketingCampaign.objects.filter(
+            pk=email_marketing_campaign.pk).update(
+                **data_fields(email_marketing_campaign.data))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_constant_contact', '0004_remotedeletion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='emailmarketingcampaign',
+            name='name',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='emailmarketingcampaign',
+            name='status',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='emailmarketingcampaign',
+            name='modified_date',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='emailmarketingcampaign',
+            name='last_run_date',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.RunPython(copy_data_fields, migrations.RunPython.noop),
+    ]
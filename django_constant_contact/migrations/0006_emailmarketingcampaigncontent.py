@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+import jsonfield.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_constant_contact',
+         '0005_emailmarketingcampaign_data_fields'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailMarketingCampaignContent',
+            fields=[
+                ('email_marketing_campaign', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='content', serialize=False, to='django_constant_contact.EmailMarketingCampaign')),
+                ('data', jsonfield.fields.JSONField()),
+            ],
+        ),
+    ]
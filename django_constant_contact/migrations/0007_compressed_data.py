@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations
+
+import django_constant_contact.fields
+from django_constant_contact.fields import rewrite
+
+
+def compress_data(apps, schema_editor):
+    """Compresses existing rows, if CONSTANT_CONTACT_COMPRESS_DATA is
+    set.  (Otherwise they're already stored as they should be.)
+    """
+    if not getattr(settings, 'CONSTANT_CONTACT_COMPRESS_DATA', False):
+        return
+    for model_name in ('EmailMarketingCampaign',
+                       'EmailMarketingCampaignContent'):
+        rewrite(apps.get_model('django_constant_contact',
+                               model_name).objects.all())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_constant_contact', '0006_emailmarketingcampaigncontent'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='emailmarketingcampaign',
+            name='data',
+            field=django_constant_contact.fields.CompressedJSONField(),
+        ),
+        migrations.AlterField(
+            model_name='emailmarketingcampaigncontent',
+            name='data',
+            field=django_constant_contact.fields.CompressedJSONField(),
+        ),
+        migrations.RunPython(compress_data, migrations.RunPython.noop),
+    ]
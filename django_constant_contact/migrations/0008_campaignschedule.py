@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_constant_contact', '0007_compressed_data'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CampaignSchedule',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('scheduled_date', models.DateTimeField(db_index=True)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('SCHEDULED', 'Scheduled'), ('FAILED', 'Failed')], db_index=True, default='PENDING', max_length=20)),
+                ('schedule_id', models.CharField(blank=True, default='', max_length=50)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('next_attempt', models.DateTimeField(blank=True, db_index=True, null=True)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('email_marketing_campaign', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='schedules', to='django_constant_contact.EmailMarketingCampaign')),
+            ],
+        ),
+    ]
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_constant_contact', '0008_campaignschedule'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrackingEvent',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('activity_type', models.CharField(max_length=20)),
+                ('contact_id', models.BigIntegerField(db_index=True, null=True)),
+                ('email_address', models.CharField(blank=True, default='', max_length=254)),
+                ('date', models.DateTimeField(null=True)),
+                ('link_id', models.CharField(blank=True, default='', max_length=50)),
+                ('bounce_code', models.CharField(blank=True, default='', max_length=10)),
+                ('email_marketing_campaign', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tracking_events', to='django_constant_contact.EmailMarketingCampaign')),
+            ],
+        ),
+        migrations.AlterIndexTogether(
+            name='trackingevent',
+            index_together=set([('email_marketing_campaign', 'activity_type', 'date')]),
+        ),
+        migrations.CreateModel(
+            name='TrackingSummary',
+            fields=[
+                ('email_marketing_campaign', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='tracking_summary', serialize=False, to='django_constant_contact.EmailMarketingCampaign')),
+                ('sends', models.PositiveIntegerField(default=0)),
+                ('opens', models.PositiveIntegerField(default=0)),
+                ('unique_opens', models.PositiveIntegerField(default=0)),
+                ('clicks', models.PositiveIntegerField(default=0)),
+                ('unique_clicks', models.PositiveIntegerField(default=0)),
+                ('forwards', models.PositiveIntegerField(default=0)),
+                ('unsubscribes', models.PositiveIntegerField(default=0)),
+                ('bounces', models.PositiveIntegerField(default=0)),
+                ('modified', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
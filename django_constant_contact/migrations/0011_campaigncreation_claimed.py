@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_constant_contact', '0010_campaigncreation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='campaigncreation',
+            name='claimed',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
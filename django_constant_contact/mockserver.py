@@ -0,0 +1,375 @@
+# -*- coding: utf-8 -*-
+"""A stand-in for the Constant Contact API, for tests and benchmarks.
+
+Implements just enough of the v2 API for ConstantContact:
+
+    GET    account/info
+    GET    emailmarketing/campaigns            (paginated)
+    POST   emailmarketing/campaigns
+    GET    emailmarketing/campaigns/{id}
+    PUT    emailmarketing/campaigns/{id}
+    DELETE emailmarketing/campaigns/{id}
+    GET    emailmarketing/campaigns/{id}/preview
+    GET    emailmarketing/campaigns/{id}/schedules
+    POST   emailmarketing/campaigns/{id}/schedules
+    GET    emailmarketing/campaigns/{id}/tracking/{activity}  (paginated)
+    GET    contacts                            (paginated)
+    GET    lists
+    POST   lists
+    POST   activities/addcontacts
+    GET    activities/{id}
+
+Campaigns, contacts and lists live in memory.  Gzipped request bodies
+are accepted, and responses are gzipped for clients that accept it.
+Latency, 5xx errors and 429s can be injected:
+
+    with MockConstantContactServer(latency=0.05,
+                                   throttle_rate=0.1) as server:
+        with override_settings(CONSTANT_CONTACT_API_URL=server.url):
+            ConstantContact().new_email_marketing_campaign(**kwargs)
+"""
+import datetime
+import json
+import random
+import re
+import socket
+import threading
+import time
+import zlib
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import parse_qs, urlencode, urlparse
+except ImportError:  # Python 2
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urllib import urlencode
+    from urlparse import parse_qs, urlparse
+
+CAMPAIGNS_PATH = '/v2/emailmarketing/campaigns'
+CONTACTS_PATH = '/v2/contacts'
+LISTS_PATH = '/v2/lists'
+ADD_CONTACTS_PATH = '/v2/activities/addcontacts'
+ACTIVITY_PATH = re.compile(r'^/v2/activities/(?P<id>\w+)$')
+CAMPAIGN_PATH = re.compile(
+    r'^/v2/emailmarketing/campaigns/(?P<id>\d+)'
+    r'(?:/(?P<sub>preview|schedules|tracking/\w+))?$')
+TRACKING_DATE_KEYS = {
+    'sends': 'send_date', 'opens': 'open_date', 'clicks': 'click_date',
+    'forwards': 'forward_date', 'unsubscribes': 'unsubscribe_date',
+    'bounces': 'bounce_date'}
+
+
+def now():
+    return datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S.%f')[
+        :-3] + 'Z'
+
+
+class MockConstantContactHandler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'  # So connections are kept alive.
+    # Headers and body are written separately; don't let a small
+    # (gzipped) body wait on the client's delayed ACK.
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        BaseHTTPRequestHandler.setup(self)
+        with self.server.lock:
+            self.server.connections[threading.current_thread()] = (
+                self.connection)
+
+    def finish(self):
+        try:
+            BaseHTTPRequestHandler.finish(self)
+        finally:
+            with self.server.lock:
+                self.server.connections.pop(threading.current_thread(), None)
+
+    def log_message(self, format, *args):
+        """Quiet, please."""
+
+    def do_GET(self):
+        self.handle_request('GET')
+
+    def do_POST(self):
+        self.handle_request('POST')
+
+    def do_PUT(self):
+        self.handle_request('PUT')
+
+    def do_DELETE(self):
+        self.handle_request('DELETE')
+
+    def handle_request(self, method):
+        server = self.server
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        if self.headers.get('Content-Encoding') == 'gzip':
+            body = zlib.decompress(body, 16 + zlib.MAX_WBITS)
+            server.gzipped_request_count += 1
+        server.count_request()
+
+        if server.latency:
+            time.sleep(server.latency)
+        with server.lock:
+            throttle = server.throttle_next > 0
+            if throttle:
+                server.throttle_next -= 1
+        if throttle or (server.throttle_rate and
+                        random.random() < server.throttle_rate):
+            headers = {}
+            if server.retry_after:
+                headers['Retry-After'] = str(server.retry_after)
+            return self.respond(429, [{'error_key': 'http.status.throttled',
+                                       'error_message': 'Too many requests'}],
+                                headers=headers)
+        if server.error_rate and random.random() < server.error_rate:
+            return self.respond(500, [{'error_key': 'http.status.error',
+                                       'error_message': 'Injected error'}])
+
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        if url.path == '/v2/account/info' and method == 'GET':
+            return self.respond(200, {'email': 'mock@example.com',
+                                      'organization_name': 'Mock'})
+        if url.path == CAMPAIGNS_PATH:
+            if method == 'POST':
+                return self.respond(201, server.create(json.loads(
+                    body.decode('utf-8'))))
+            if method == 'GET':
+                return self.respond(200, server.list(query))
+        if url.path == CONTACTS_PATH and method == 'GET':
+            return self.respond(200, server.paginate(
+                server.contacts, query, CONTACTS_PATH, default_limit=500))
+        if url.path == LISTS_PATH:
+            if method == 'POST':
+                return self.respond(201, server.create_list(json.loads(
+                    body.decode('utf-8'))))
+            if method == 'GET':
+                return self.respond(200, server.lists)
+        if url.path == ADD_CONTACTS_PATH and method == 'POST':
+            return self.respond(201, server.add_contacts(json.loads(
+                body.decode('utf-8'))))
+        match = ACTIVITY_PATH.match(url.path)
+        if match and method == 'GET' and match.group('id') in (
+                server.activities):
+            return self.respond(200, server.activities[match.group('id')])
+        match = CAMPAIGN_PATH.match(url.path)
+        if match:
+            campaign = server.campaigns.get(match.group('id'))
+            if campaign is None:
+                return self.respond(404, [{
+                    'error_key': 'http.status.not_found',
+                    'error_message': 'Campaign not found'}])
+            sub = match.group('sub')
+            if sub == 'preview':
+                if method == 'GET':
+                    return self.respond(200, {
+                        'preview_email_content': campaign['email_content'],
+                        'preview_text_content': campaign['text_content']})
+            elif sub == 'schedules':
+                if method == 'POST':
+                    return self.respond(201, server.schedule(
+                        campaign, json.loads(body.decode('utf-8') or '{}')))
+                if method == 'GET':
+                    return self.respond(200, campaign.get('schedules', []))
+            elif sub and sub.startswith('tracking/'):
+                activity = sub.split('/', 1)[1]
+                if method == 'GET' and activity in TRACKING_DATE_KEYS:
+                    return self.respond(200, server.paginate(
+                        server.tracking.get((campaign['id'], activity), []),
+                        query, url.path, default_limit=500,
+                        since=('created_since',
+                               TRACKING_DATE_KEYS[activity])))
+            elif method == 'GET':
+                return self.respond(200, campaign)
+            elif method == 'PUT':
+                return self.respond(200, server.update(
+                    campaign, json.loads(body.decode('utf-8'))))
+            elif method == 'DELETE':
+                server.delete(campaign)
+                return self.respond(204)
+        self.respond(404, [{'error_key': 'http.status.not_found',
+                            'error_message': 'No such endpoint'}])
+
+    def respond(self, status_code, content=None, headers=None):
+        body = b'' if content is None else json.dumps(content).encode('utf-8')
+        self.send_response(status_code)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if body:
+            self.send_header('Content-Type', 'application/json')
+            if 'gzip' in (self.headers.get('Accept-Encoding') or ''):
+                compressor = zlib.compressobj(6, zlib.DEFLATED,
+                                              16 + zlib.MAX_WBITS)
+                body = compressor.compress(body) + compressor.flush()
+                self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class MockConstantContactServer(ThreadingMixIn, HTTPServer):
+    """The mock API server; runs in a background thread.
+
+    `latency` is seconds added to every response; `error_rate` and
+    `throttle_rate` are the fractions of requests answered with a 500
+    and a 429.  `retry_after`, if set, is sent as the 429s' Retry-After
+    header.  Set `throttle_next` to answer that many of the next
+    requests with a 429, whatever the throttle_rate.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, latency=0, error_rate=0, throttle_rate=0,
+                 retry_after=None, host='127.0.0.1', port=0):
+        HTTPServer.__init__(self, (host, port), MockConstantContactHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.throttle_next = 0
+        self.campaigns = {}
+        self.contacts = []
+        self.lists = []
+        self.activities = {}
+        # (campaign ID, activity): [event, ...]
+        self.tracking = {}
+        self.request_count = 0
+        self.gzipped_request_count = 0
+        self.lock = threading.Lock()
+        self.next_id = 1100000000000
+        self.thread = None
+        # Open (kept-alive) connections, by the thread handling them.
+        self.connections = {}
+
+    @property
+    def url(self):
+        """The API_URL to point ConstantContact at."""
+        return 'http://{0}:{1}/v2/'.format(*self.server_address[:2])
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Stops serving, and closes kept-alive connections, waiting
+        for the threads handling them to finish.
+        """
+        self.shutdown()
+        with self.lock:
+            connections = list(self.connections.items())
+        for thread, connection in connections:
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except socket.error:  # Already closed.
+                pass
+        for thread, connection in connections:
+            thread.join(1)
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def count_request(self):
+        with self.lock:
+            self.request_count += 1
+
+    def new_id(self):
+        with self.lock:
+            self.next_id += 1
+            return str(self.next_id)
+
+    def create(self, data):
+        campaign_id = self.new_id()
+        campaign = dict(data, id=campaign_id, status='DRAFT',
+                        created_date=now(), modified_date=now())
+        self.campaigns[campaign_id] = campaign
+        return campaign
+
+    def update(self, campaign, data):
+        campaign.update(data)
+        campaign['modified_date'] = now()
+        return campaign
+
+    def schedule(self, campaign, data):
+        schedule = {'id': self.new_id(),
+                    'scheduled_date': data.get('scheduled_date', now())}
+        campaign.setdefault('schedules', []).append(schedule)
+        campaign['status'] = 'SCHEDULED'
+        campaign['modified_date'] = now()
+        return schedule
+
+    def delete(self, campaign):
+        self.campaigns.pop(campaign['id'], None)
+
+    def list(self, query):
+        campaigns = sorted(self.campaigns.values(),
+                           key=lambda campaign: campaign['id'])
+        page = self.paginate(campaigns, query, CAMPAIGNS_PATH)
+        page['results'] = [dict((key, campaign[key])
+                                for key in ('id', 'name', 'status',
+                                            'modified_date'))
+                           for campaign in page['results']]
+        return page
+
+    def paginate(self, items, query, path, default_limit=50,
+                 since=('modified_since', 'modified_date')):
+        """Returns a page of `items`, as Constant Contact would.
+
+        `since` is the query parameter that filters items by date, and
+        the key of the date in each item.
+        """
+        since_param, date_key = since
+        modified_since = query.get(since_param, [None])[0]
+        if modified_since:
+            items = [item for item in items
+                     if item[date_key] >= modified_since]
+        limit = int(query.get('limit', [str(default_limit)])[0])
+        start = int(query.get('next', ['0'])[0])
+        page = items[start:start + limit]
+        pagination = {}
+        if start + limit < len(items):
+            next_query = {'next': start + limit, 'limit': limit}
+            if modified_since:
+                next_query[since_param] = modified_since
+            pagination['next_link'] = '{0}?{1}'.format(
+                path, urlencode(sorted(next_query.items())))
+        return {'meta': {'pagination': pagination}, 'results': page}
+
+    def track(self, campaign_id, activity, **event):
+        """Records a tracking event (e.g. an open) for a campaign."""
+        event.setdefault(TRACKING_DATE_KEYS[activity], now())
+        self.tracking.setdefault((str(campaign_id), activity), []).append(
+            dict(event, campaign_id=str(campaign_id)))
+
+    def create_list(self, data):
+        contact_list = dict(data, id=self.new_id(), contact_count=0,
+                            created_date=now(), modified_date=now())
+        self.lists.append(contact_list)
+        return contact_list
+
+    def add_contacts(self, data):
+        """Imports contacts at once (a real import is queued)."""
+        lists = [{'id': list_id} for list_id in data.get('lists', [])]
+        for contact in data['import_data']:
+            self.contacts.append({
+                'id': self.new_id(),
+                'status': 'ACTIVE',
+                'email_addresses': [{'email_address': email}
+                                    for email in contact['email_addresses']],
+                'first_name': contact.get('first_name', ''),
+                'last_name': contact.get('last_name', ''),
+                'lists': lists,
+                'modified_date': now()})
+        activity = {'id': self.new_id(), 'type': 'ADD_CONTACTS',
+                    'status': 'COMPLETE',
+                    'contact_count': len(data['import_data'])}
+        self.activities[activity['id']] = activity
+        return activity
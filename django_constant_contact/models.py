@@ -1,22 +1,73 @@
 # -*- coding: utf-8 -*-
 
+import datetime
+import hashlib
 import json
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
-import jsonfield
-import nap
 from django.conf import settings
-from django.db import models
-from django.db.models.signals import pre_delete, pre_save
-from htmlmin.minify import html_minify
-from premailer import Premailer
+from django.core.cache import caches
+from django.db import models, transaction
+from django.db.models.signals import post_save, pre_delete, pre_save
+from django.utils import dateparse, timezone
+from django.utils.timezone import utc
+
+from . import rendering, serialization
+from .fields import CompressedJSONField
+from .instrumentation import timed
+from .ratelimit import parse_retry_after
+# work_around() used to live here.
+from .rendering import work_around  # NOQA
+from .transport import DEFAULT_POOL_SIZE, SessionUrl
+
+DEFAULT_PREVIEW_CACHE_TIMEOUT = 60 * 60
+
+# Slack for the difference between our clock and Constant Contact's,
+# when looking for campaigns created or modified since a given time.
+CLOCK_SKEW = datetime.timedelta(minutes=10)
+
+# How long an idempotent create holds its key; after that, a create
+# that hasn't finished is taken to have died, and a retry takes over.
+CREATION_CLAIM_TIMEOUT = datetime.timedelta(minutes=5)
+
+# 4xxs that mean "not now", rather than "never".
+RETRY_LATER_STATUS_CODES = (408, 429)
+
+# Constant Contact takes up to 40,000 contacts, and 4 MB, per import.
+ADD_CONTACTS_BATCH_SIZE = 20000
+
+# Import column names for contact keys; other keys are upper-cased,
+# with spaces for underscores.
+IMPORT_COLUMN_NAMES = {
+    'email_addresses': 'EMAIL',
+    'first_name': 'FIRST NAME',
+    'middle_name': 'MIDDLE NAME',
+    'last_name': 'LAST NAME',
+    'company_name': 'COMPANY NAME',
+    'job_title': 'JOB TITLE',
+    'work_phone': 'WORK PHONE',
+    'home_phone': 'HOME PHONE',
+}
+
+try:
+    string_types = basestring  # Python 2
+except NameError:
+    string_types = str
 
 
 class ConstantContactAPIError(Exception):
     """An exception that passes error info from response to exception catcher.
+
+    `retry_after` is the seconds the response's Retry-After header asks
+    callers to wait (0 without one).
     """
 
     def __init__(self, response, *args, **kwargs):
         super(ConstantContactAPIError, self).__init__(*args, **kwargs)
+        self.status_code = response.status_code
+        self.retry_after = parse_retry_after(
+            getattr(response, 'headers', None) or {})
         self.message = str(response.status_code) + ': ' + response.reason
         self.errors = json.loads(response.content)
 
@@ -28,14 +79,34 @@ class ConstantContactAPIError(Exception):
         return s
 
 
+class CampaignCreationInProgress(Exception):
+    """Raised by an idempotent create while another create under the
+    same key is in progress.  Retry later.
+    """
+
+    def __init__(self, key):
+        super(CampaignCreationInProgress, self).__init__(
+            'A campaign is being created under {0!r}.'.format(key))
+        self.key = key
+
+
 class ConstantContact(object):
 
     API_URL = 'https://api.constantcontact.com/v2/'
     EMAIL_MARKETING_CAMPAIGN_URL = 'emailmarketing/campaigns'
+    CONTACTS_URL = 'contacts'
+    LISTS_URL = 'lists'
+    ACTIVITIES_URL = 'activities'
+    ADD_CONTACTS_URL = 'activities/addcontacts'
 
-    def __init__(self):
-        self.api = nap.url.Url(
-            self.API_URL,
+    def __init__(self, session=None):
+        """`session` is a requests.Session to send requests through;
+        by default, a process-wide, connection-pooled session is shared
+        by all ConstantContact instances (see transport.py).
+        """
+        self.api = SessionUrl(
+            getattr(settings, 'CONSTANT_CONTACT_API_URL', self.API_URL),
+            session=session,
             params={'api_key': settings.CONSTANT_CONTACT_API_KEY,
                     'access_token': settings.CONSTANT_CONTACT_ACCESS_TOKEN})
 
@@ -53,24 +124,49 @@ class ConstantContact(object):
 
         response.raise_for_status()
 
-    def new_email_marketing_campaign(self, name, email_content, from_email,
-                                     from_name, reply_to_email, subject,
-                                     text_content, address,
-                                     is_view_as_webpage_enabled=False,
-                                     view_as_web_page_link_text='',
-                                     view_as_web_page_text='',
-                                     is_permission_reminder_enabled=False,
-                                     permission_reminder_text=''):
-        """Create a Constant Contact email marketing campaign.
-        Returns an EmailMarketingCampaign object.
+    def post_json(self, relative_url, data):
+        """POSTs `data`, as JSON, to `relative_url`; returns the JSON
+        response.
+        """
+        with timed('serialize'):
+            body = serialization.dumps(data)
+        response = self.api.join(relative_url).post(
+            data=body, headers={'content-type': 'application/json'})
+        self.handle_response_status(response)
+        with timed('parse'):
+            return serialization.loads(response.content)
+
+    def prepare_email_content(self, email_content):
+        """Returns email_content ready to send to Constant Contact.
+
+        CSS is inlined, the HTML minified, and characters Constant
+        Contact chokes on are replaced.  See rendering.render() for
+        caching, and rendering in a process pool.
         """
-        url = self.api.join(self.EMAIL_MARKETING_CAMPAIGN_URL)
+        return rendering.render(email_content)
 
-        inlined_email_content = self.inline_css(email_content)
-        minified_email_content = html_minify(inlined_email_content)
-        worked_around_email_content = work_around(minified_email_content)
+    def email_marketing_campaign_data(self, name, email_content, from_email,
+                                      from_name, reply_to_email, subject,
+                                      text_content, address,
+                                      is_view_as_webpage_enabled=False,
+                                      view_as_web_page_link_text='',
+                                      view_as_web_page_text='',
+                                      is_permission_reminder_enabled=False,
+                                      permission_reminder_text='',
+                                      prepared=False):
+        """Returns the payload used to create or update an email
+        marketing campaign.
 
-        data = {
+        Pass prepared=True if email_content has already been through
+        prepare_email_content().
+        """
+        if prepared:
+            worked_around_email_content = email_content
+        else:
+            worked_around_email_content = self.prepare_email_content(
+                email_content)
+
+        return {
             'name': name,
             'subject': subject,
             'from_name': from_name,
@@ -97,12 +193,167 @@ class ConstantContact(object):
             'permission_reminder_text': permission_reminder_text
         }
 
-        response = url.post(data=json.dumps(data),
-                            headers={'content-type': 'application/json'})
+    def post_email_marketing_campaign(self, data, include_content=True):
+        """POSTs a new email marketing campaign to Constant Contact.
+        Returns Constant Contact's JSON for the new campaign (without
+        its content, unless `include_content`; see trim_content()).
+        """
+        response_data = self.post_json(self.EMAIL_MARKETING_CAMPAIGN_URL,
+                                       data)
+        return response_data if include_content else trim_content(
+            response_data)
+
+    def put_email_marketing_campaign(self, email_marketing_campaign, data,
+                                     include_content=True):
+        """PUTs new data for an email marketing campaign to Constant Contact.
+        Returns Constant Contact's JSON for the updated campaign (without
+        its content, unless `include_content`; see trim_content()).
+        """
+        url = self.api.join(
+            '/'.join([self.EMAIL_MARKETING_CAMPAIGN_URL,
+                      str(email_marketing_campaign.constant_contact_id)]))
+
+        with timed('serialize'):
+            body = serialization.dumps(data)
+        response = url.put(data=body,
+                           headers={'content-type': 'application/json'})
 
         self.handle_response_status(response)
 
-        return EmailMarketingCampaign.objects.create(data=response.json())
+        with timed('parse'):
+            response_data = serialization.loads(response.content)
+        return response_data if include_content else trim_content(
+            response_data)
+
+    def new_email_marketing_campaign(self, name, email_content, from_email,
+                                     from_name, reply_to_email, subject,
+                                     text_content, address,
+                                     is_view_as_webpage_enabled=False,
+                                     view_as_web_page_link_text='',
+                                     view_as_web_page_text='',
+                                     is_permission_reminder_enabled=False,
+                                     permission_reminder_text='',
+                                     idempotency_key=None,
+                                     include_content=True):
+        """Create a Constant Contact email marketing campaign.
+        Returns an EmailMarketingCampaign object.
+
+        Pass an `idempotency_key` (any string up to 64 characters,
+        unique to this campaign) to make retries safe; see
+        create_email_marketing_campaign_once().  With
+        include_content=False, the content Constant Contact echoes
+        back isn't saved in the campaign's `data`.
+        """
+        data = self.email_marketing_campaign_data(
+            name=name, email_content=email_content, from_email=from_email,
+            from_name=from_name, reply_to_email=reply_to_email,
+            subject=subject, text_content=text_content, address=address,
+            is_view_as_webpage_enabled=is_view_as_webpage_enabled,
+            view_as_web_page_link_text=view_as_web_page_link_text,
+            view_as_web_page_text=view_as_web_page_text,
+            is_permission_reminder_enabled=is_permission_reminder_enabled,
+            permission_reminder_text=permission_reminder_text)
+
+        if idempotency_key is not None:
+            return self.create_email_marketing_campaign_once(
+                idempotency_key, data, include_content=include_content)
+
+        response_data = self.post_email_marketing_campaign(
+            data, include_content=include_content)
+        with timed('db'):
+            return EmailMarketingCampaign.objects.create(
+                data=response_data,
+                payload_fingerprint=payload_fingerprint(data))
+
+    def create_email_marketing_campaign_once(self, key, data,
+                                             include_content=True):
+        """Creates a campaign from `data` (see
+        email_marketing_campaign_data()) unless it's already been
+        created under `key`.  Returns its EmailMarketingCampaign.
+
+        A PENDING CampaignCreation is saved under `key` before the
+        POST, and marked CREATED, in the same transaction as the
+        EmailMarketingCampaign is saved.  While a call holds `key` (see
+        CampaignCreation.claim()), other calls with it raise
+        CampaignCreationInProgress rather than POST too.  If an earlier
+        call with `key` didn't finish (the POST timed out, the process
+        died, saving failed), the campaign it may have created is
+        looked for first (see find_created_campaign()), and adopted
+        rather than created twice.  An adopted campaign's
+        payload_fingerprint is blank, so the next update is sent.
+        """
+        creation, created = CampaignCreation.objects.get_or_create(
+            key=key, defaults={'name': data['name'][:255],
+                               'claimed': timezone.now()})
+        if creation.status == CampaignCreation.CREATED:
+            return EmailMarketingCampaign.objects.get(
+                constant_contact_id=creation.constant_contact_id)
+        if not created and not creation.claim():
+            raise CampaignCreationInProgress(key)
+
+        try:
+            response_data = None if created else self.find_created_campaign(
+                creation)
+            if response_data is None:
+                fingerprint = payload_fingerprint(data)
+                response_data = self.post_email_marketing_campaign(
+                    data, include_content=include_content)
+            else:
+                fingerprint = ''
+                if not include_content:
+                    response_data = trim_content(response_data)
+            # So the campaign can be found by ID if saving it fails.
+            CampaignCreation.objects.filter(pk=creation.pk).update(
+                constant_contact_id=response_data['id'])
+
+            with timed('db'), transaction.atomic():
+                email_marketing_campaign, _ = (
+                    EmailMarketingCampaign.objects.update_or_create(
+                        constant_contact_id=response_data['id'],
+                        defaults={'data': response_data,
+                                  'payload_fingerprint': fingerprint}))
+                CampaignCreation.objects.filter(pk=creation.pk).update(
+                    status=CampaignCreation.CREATED)
+        except Exception:
+            # Let a retry take over now, rather than after the timeout.
+            creation.release()
+            raise
+        return email_marketing_campaign
+
+    def find_created_campaign(self, creation):
+        """Returns Constant Contact's JSON for the campaign a
+        CampaignCreation created, or None if it didn't get that far.
+
+        Looks it up by ID, if that was saved, else by name among the
+        campaigns modified since the creation began, leaving out any
+        another EmailMarketingCampaign or CampaignCreation has (see
+        taken_campaign_ids()).
+        """
+        constant_contact_id = creation.constant_contact_id
+        if not constant_contact_id:
+            ids = [int(summary['id'])
+                   for summary in self.iter_email_marketing_campaigns(
+                       modified_since=creation.created - CLOCK_SKEW)
+                   if summary.get('name') == creation.name]
+            ids = sorted(set(ids) - taken_campaign_ids(ids))
+            if not ids:
+                return None
+            constant_contact_id = ids[0]
+        try:
+            return self.get_email_marketing_campaign(constant_contact_id)
+        except ConstantContactAPIError as exc:
+            if exc.status_code == 404:
+                return None
+            raise
+
+    def get_email_marketing_campaign(self, constant_contact_id):
+        """Returns Constant Contact's JSON for a campaign."""
+        response = self.api.join('/'.join([
+            self.EMAIL_MARKETING_CAMPAIGN_URL,
+            str(constant_contact_id)])).get()
+        self.handle_response_status(response)
+        with timed('parse'):
+            return serialization.loads(response.content)
 
     def update_email_marketing_campaign(self, email_marketing_campaign,
                                         name, email_content, from_email,
@@ -112,54 +363,176 @@ class ConstantContact(object):
                                         view_as_web_page_link_text='',
                                         view_as_web_page_text='',
                                         is_permission_reminder_enabled=False,
-                                        permission_reminder_text=''):
+                                        permission_reminder_text='',
+                                        force=False, include_content=True):
         """Update a Constant Contact email marketing campaign.
         Returns the updated EmailMarketingCampaign object.
+
+        If the payload is the same as the one last sent for this
+        campaign, nothing is sent or saved, unless `force` is True.
+        With include_content=False, the content Constant Contact
+        echoes back isn't saved (and content saved before is dropped).
         """
-        url = self.api.join(
-            '/'.join([self.EMAIL_MARKETING_CAMPAIGN_URL,
-                      str(email_marketing_campaign.constant_contact_id)]))
+        data = self.email_marketing_campaign_data(
+            name=name, email_content=email_content, from_email=from_email,
+            from_name=from_name, reply_to_email=reply_to_email,
+            subject=subject, text_content=text_content, address=address,
+            is_view_as_webpage_enabled=is_view_as_webpage_enabled,
+            view_as_web_page_link_text=view_as_web_page_link_text,
+            view_as_web_page_text=view_as_web_page_text,
+            is_permission_reminder_enabled=is_permission_reminder_enabled,
+            permission_reminder_text=permission_reminder_text)
 
-        inlined_email_content = self.inline_css(email_content)
-        minified_email_content = html_minify(inlined_email_content)
-        worked_around_email_content = work_around(minified_email_content)
+        fingerprint = payload_fingerprint(data)
+        if (not force and
+                fingerprint == email_marketing_campaign.payload_fingerprint):
+            return email_marketing_campaign
 
-        data = {
-            'name': name,
-            'subject': subject,
-            'from_name': from_name,
-            'from_email': from_email,
-            'reply_to_email': reply_to_email,
-            'email_content': worked_around_email_content,
-            'email_content_format': 'HTML',
-            'text_content': text_content,
-            'message_footer': {
-                'organization_name': address['organization_name'],
-                'address_line_1': address['address_line_1'],
-                'address_line_2': address['address_line_2'],
-                'address_line_3': address['address_line_3'],
-                'city': address['city'],
-                'state': address['state'],
-                'international_state': address['international_state'],
-                'postal_code': address['postal_code'],
-                'country': address['country']
-            },
-            'is_view_as_webpage_enabled': is_view_as_webpage_enabled,
-            'view_as_web_page_link_text': view_as_web_page_link_text,
-            'view_as_web_page_text': view_as_web_page_text,
-            'is_permission_reminder_enabled': is_permission_reminder_enabled,
-            'permission_reminder_text': permission_reminder_text
-        }
+        email_marketing_campaign.data = self.put_email_marketing_campaign(
+            email_marketing_campaign, data, include_content=include_content)
+        email_marketing_campaign.payload_fingerprint = fingerprint
+        with timed('db'):
+            email_marketing_campaign.save()
+            if not include_content:
+                EmailMarketingCampaign.delete_content(
+                    [email_marketing_campaign])
+        self.invalidate_preview(email_marketing_campaign)
 
-        response = url.put(data=json.dumps(data),
-                           headers={'content-type': 'application/json'})
+        return email_marketing_campaign
 
-        self.handle_response_status(response)
+    def dispatch(self, func, items, max_workers=None):
+        """Calls func(item) for each of items on a pool of threads.
 
-        email_marketing_campaign.data = response.json()
-        email_marketing_campaign.save()
+        Returns a list of results, in the order of items.  When func
+        raises an exception, the exception is returned as the result
+        for that item, so one bad item can't lose the others' results.
+        Items that are exceptions already (a payload that couldn't be
+        built, say) are returned as they are.
+        """
+        def call(item):
+            if isinstance(item, Exception):
+                return item
+            try:
+                return func(item)
+            except Exception as exc:
+                return exc
 
-        return email_marketing_campaign
+        max_workers = max_workers or getattr(
+            settings, 'CONSTANT_CONTACT_POOL_SIZE', DEFAULT_POOL_SIZE)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(call, items))
+
+    def prepare_campaigns(self, campaigns):
+        """Returns a list of copies of the campaign kwargs in `campaigns`,
+        with their email_content prepared (see rendering.render_many()).
+        """
+        campaigns = [dict(kwargs) for kwargs in campaigns]
+        prepared = rendering.render_many(
+            [kwargs['email_content'] for kwargs in campaigns])
+        for kwargs, email_content in zip(campaigns, prepared):
+            kwargs['email_content'] = email_content
+        return campaigns
+
+    def campaign_payloads(self, campaigns):
+        """Returns an (email_marketing_campaign, payload) pair for each
+        dict of (prepared) keyword arguments in `campaigns`, or the
+        exception raised building the payload.
+
+        email_marketing_campaign is popped from the dict (None if it
+        isn't there); the rest are for email_marketing_campaign_data().
+        """
+        payloads = []
+        for kwargs in campaigns:
+            kwargs = dict(kwargs)
+            email_marketing_campaign = kwargs.pop('email_marketing_campaign',
+                                                  None)
+            try:
+                payloads.append((email_marketing_campaign,
+                                 self.email_marketing_campaign_data(
+                                     prepared=True, **kwargs)))
+            except Exception as exc:
+                payloads.append(exc)
+        return payloads
+
+    def bulk_create_campaigns(self, campaigns, max_workers=None,
+                              include_content=True):
+        """Create many Constant Contact email marketing campaigns.
+
+        `campaigns` is an iterable of dicts of keyword arguments for
+        new_email_marketing_campaign().  All the email content is
+        rendered first (in parallel, given a render process pool; see
+        rendering.py) and every payload is built, then campaigns are
+        POSTed by up to `max_workers` threads at once (within the rate
+        limit), then all the new EmailMarketingCampaigns are saved with
+        one bulk_create().  Items whose payload can't be built aren't
+        sent.
+
+        Returns a list with an EmailMarketingCampaign, or the exception
+        raised while creating it, for each item in `campaigns`.
+        `include_content` is as for new_email_marketing_campaign().
+        """
+        def create(item):
+            _, data = item
+            return EmailMarketingCampaign(
+                data=self.post_email_marketing_campaign(
+                    data, include_content=include_content),
+                payload_fingerprint=payload_fingerprint(data))
+
+        payloads = self.campaign_payloads(self.prepare_campaigns(campaigns))
+        results = self.dispatch(create, payloads, max_workers)
+
+        with timed('db'):
+            saved = EmailMarketingCampaign.bulk_create_data(
+                [result for result in results
+                 if not isinstance(result, Exception)])
+
+        return [result if isinstance(result, Exception)
+                else saved[int(result.constant_contact_id)]
+                for result in results]
+
+    def bulk_update_campaigns(self, campaigns, max_workers=None,
+                              force=False, include_content=True):
+        """Update many Constant Contact email marketing campaigns.
+
+        `campaigns` is an iterable of dicts of keyword arguments for
+        update_email_marketing_campaign().  Like bulk_create_campaigns(),
+        content is rendered up front and the PUTs are made
+        concurrently, then the local rows are updated together (see
+        EmailMarketingCampaign.bulk_update_data()).  Campaigns whose
+        payload hasn't changed are skipped, unless `force` is True.
+
+        Returns a list with the updated EmailMarketingCampaign, or the
+        exception raised while updating it, for each item in
+        `campaigns`.  `include_content` is as for
+        update_email_marketing_campaign().
+        """
+        updated = []
+
+        def update(item):
+            email_marketing_campaign, data = item
+            if email_marketing_campaign is None:
+                raise ValueError('No email_marketing_campaign to update.')
+            fingerprint = payload_fingerprint(data)
+            if (not force and fingerprint ==
+                    email_marketing_campaign.payload_fingerprint):
+                return email_marketing_campaign
+            email_marketing_campaign.data = self.put_email_marketing_campaign(
+                email_marketing_campaign, data,
+                include_content=include_content)
+            email_marketing_campaign.payload_fingerprint = fingerprint
+            updated.append(email_marketing_campaign)
+            self.invalidate_preview(email_marketing_campaign)
+            return email_marketing_campaign
+
+        payloads = self.campaign_payloads(self.prepare_campaigns(campaigns))
+        results = self.dispatch(update, payloads, max_workers)
+
+        with timed('db'):
+            EmailMarketingCampaign.bulk_update_data(updated)
+            if not include_content:
+                EmailMarketingCampaign.delete_content(updated)
+
+        return results
 
     def delete_email_marketing_campaign(self, email_marketing_campaign):
         """Deletes a Constant Contact email marketing campaign.
@@ -169,26 +542,574 @@ class ConstantContact(object):
             str(email_marketing_campaign.constant_contact_id)]))
         response = url.delete()
         self.handle_response_status(response)
+        self.invalidate_preview(email_marketing_campaign)
         return response
 
     def inline_css(self, html):
         """Inlines CSS defined in external style sheets.
         """
-        premailer = Premailer(html)
-        inlined_html = premailer.transform(pretty_print=True)
-        return inlined_html
+        return rendering.inline_css(html)
+
+    def schedules_url(self, email_marketing_campaign):
+        return '/'.join([self.EMAIL_MARKETING_CAMPAIGN_URL,
+                         str(email_marketing_campaign.constant_contact_id),
+                         'schedules'])
+
+    def schedule_campaign(self, email_marketing_campaign,
+                          scheduled_date=None):
+        """Schedules an email marketing campaign to be sent at
+        `scheduled_date` (a datetime or an ISO-8601 string; see
+        iso_8601()), or now, if it's None.
+
+        Returns Constant Contact's JSON for the schedule.
+        """
+        data = {}
+        if scheduled_date:
+            data['scheduled_date'] = iso_8601(scheduled_date)
+        return self.post_json(self.schedules_url(email_marketing_campaign),
+                              data)
+
+    def get_schedules(self, email_marketing_campaign):
+        """Returns Constant Contact's JSON for an email marketing
+        campaign's schedules (a list).
+        """
+        response = self.api.join(
+            self.schedules_url(email_marketing_campaign)).get()
+        self.handle_response_status(response)
+        with timed('parse'):
+            return serialization.loads(response.content)
+
+    def queue_schedules(self, email_marketing_campaigns, scheduled_date):
+        """Queues each of `email_marketing_campaigns` to be scheduled,
+        by process_schedules(), for `scheduled_date` (a datetime).
+
+        Returns the CampaignSchedules.
+        """
+        return CampaignSchedule.objects.bulk_create([
+            CampaignSchedule(email_marketing_campaign=email_marketing_campaign,
+                             scheduled_date=scheduled_date)
+            for email_marketing_campaign in email_marketing_campaigns])
+
+    def process_schedules(self, max_workers=None, batch_size=100,
+                          max_attempts=5):
+        """Schedules the campaigns queued as pending CampaignSchedules
+        at Constant Contact.
+
+        Schedules are made concurrently (see dispatch()), `batch_size`
+        at a time, soonest scheduled_date first, until none are due.
+        Failures are retried, with short exponential backoff, up to
+        `max_attempts` times -- first checking whether the last attempt
+        got through after all.  Throttled or timed out schedules (a 429
+        or 408) are retried no sooner than Retry-After asks, without
+        using up attempts.  Schedules Constant Contact rejects (any
+        other 4xx), or whose scheduled_date has passed, fail at once.
+
+        Returns a (scheduled, failed) tuple of counts; schedules left
+        to retry later count as neither.
+        """
+        def schedule(campaign_schedule):
+            if campaign_schedule.next_attempt:
+                for existing in self.get_schedules(
+                        campaign_schedule.email_marketing_campaign):
+                    if (existing.get('scheduled_date') ==
+                            iso_8601(campaign_schedule.scheduled_date)):
+                        return existing
+            return self.schedule_campaign(
+                campaign_schedule.email_marketing_campaign,
+                campaign_schedule.scheduled_date)
+
+        scheduled = failed = 0
+        seen = set()
+        while True:
+            now = timezone.now()
+            failed += CampaignSchedule.objects.filter(
+                status=CampaignSchedule.PENDING,
+                scheduled_date__lte=now).update(
+                    status=CampaignSchedule.FAILED,
+                    last_error='The scheduled date passed.')
+            campaign_schedules = list(
+                CampaignSchedule.objects.filter(
+                    status=CampaignSchedule.PENDING,
+                    attempts__lt=max_attempts).exclude(pk__in=seen).filter(
+                    models.Q(next_attempt__isnull=True) |
+                    models.Q(next_attempt__lte=now)).select_related(
+                        'email_marketing_campaign').order_by(
+                            'scheduled_date', 'pk')[:batch_size])
+            if not campaign_schedules:
+                return scheduled, failed
+            seen.update(c.pk for c in campaign_schedules)
+
+            results = self.dispatch(schedule, campaign_schedules,
+                                    max_workers)
+
+            with transaction.atomic():
+                for campaign_schedule, result in zip(campaign_schedules,
+                                                     results):
+                    if not isinstance(result, Exception):
+                        campaign_schedule.status = CampaignSchedule.SCHEDULED
+                        campaign_schedule.schedule_id = str(result['id'])
+                        campaign_schedule.last_error = ''
+                        campaign_schedule.save()
+                        scheduled += 1
+                        continue
+                    campaign_schedule.last_error = str(result)
+                    status_code = getattr(result, 'status_code', None)
+                    retry_later = status_code in RETRY_LATER_STATUS_CODES
+                    if not retry_later:
+                        campaign_schedule.attempts += 1
+                    if not retry_later and (
+                            status_code and 400 <= status_code < 500 or
+                            campaign_schedule.attempts >= max_attempts):
+                        campaign_schedule.status = CampaignSchedule.FAILED
+                        failed += 1
+                    else:
+                        campaign_schedule.next_attempt = (
+                            now + datetime.timedelta(seconds=max(
+                                min(5 * 60,
+                                    15 * 2 ** campaign_schedule.attempts),
+                                getattr(result, 'retry_after', 0))))
+                    campaign_schedule.save()
+
+    def process_remote_deletions(self, max_workers=None, batch_size=100,
+                                 max_attempts=5):
+        """Deletes the email marketing campaigns queued as
+        RemoteDeletions from Constant Contact.
+
+        Deletions are made concurrently (see dispatch()), `batch_size`
+        at a time, until none are due.  Campaigns that are already gone
+        count as deleted.  Failures are retried later, with exponential
+        backoff, up to `max_attempts` times.
+
+        Returns a (deleted, failed) tuple of counts.
+        """
+        def delete(remote_deletion):
+            return self.delete_email_marketing_campaign(
+                EmailMarketingCampaign(
+                    constant_contact_id=remote_deletion.constant_contact_id))
+
+        deleted = failed = 0
+        seen = set()
+        while True:
+            now = timezone.now()
+            remote_deletions = list(
+                RemoteDeletion.objects.filter(
+                    attempts__lt=max_attempts).filter(
+                        models.Q(next_attempt__isnull=True) |
+                        models.Q(next_attempt__lte=now)).exclude(
+                            pk__in=seen).order_by('pk')[:batch_size])
+            if not remote_deletions:
+                return deleted, failed
+            seen.update(r.pk for r in remote_deletions)
+
+            results = self.dispatch(delete, remote_deletions, max_workers)
 
-    def preview_email_marketing_campaign(self, email_marketing_campaign):
+            done = []
+            for remote_deletion, result in zip(remote_deletions, results):
+                if (not isinstance(result, Exception) or
+                        getattr(result, 'status_code', None) == 404):
+                    done.append(remote_deletion.pk)
+                    continue
+                remote_deletion.attempts += 1
+                remote_deletion.last_error = str(result)
+                remote_deletion.next_attempt = now + datetime.timedelta(
+                    seconds=min(60 * 60, 30 * 2 ** remote_deletion.attempts))
+                remote_deletion.save()
+                failed += 1
+            RemoteDeletion.objects.filter(pk__in=done).delete()
+            deleted += len(done)
+
+    def reconcile_campaigns(self, older_than=datetime.timedelta(minutes=10)):
+        """Settles interrupted idempotent creates (see
+        create_email_marketing_campaign_once()), and finds possible
+        duplicates.
+
+        PENDING CampaignCreations older than `older_than`, that no
+        create holds (see CampaignCreation.claim()), are settled.  One
+        whose campaign ID was recorded is adopted if that campaign
+        exists at Constant Contact: the EmailMarketingCampaign is
+        saved, and it's marked CREATED.  One without is matched, by
+        name, against one listing of the campaigns modified since the
+        oldest of them began, leaving out campaigns another
+        EmailMarketingCampaign or CampaignCreation has; oldest
+        creation and oldest campaign first.  The rest are marked
+        FAILED; creating again with their key POSTs anew.
+
+        Campaigns left over after matching, that are named like a
+        creation without a recorded ID, may be duplicates left by
+        retries -- or campaigns made by hand.  They're only reported;
+        see delete_duplicate_campaigns().
+
+        Returns an (adopted, failed, duplicates) tuple: counts, and a
+        dict of the CampaignCreation key each possible duplicate was
+        named like, by campaign ID.
+        """
+        stale = [creation for creation in CampaignCreation.objects.filter(
+            status=CampaignCreation.PENDING,
+            created__lt=timezone.now() - older_than).order_by('created', 'pk')
+            if creation.claim()]
+        try:
+            return self.settle_creations(stale)
+        finally:
+            for creation in stale:
+                if creation.status == CampaignCreation.PENDING:
+                    creation.release()
+
+    def settle_creations(self, stale):
+        """Adopts or fails each of the claimed CampaignCreations in
+        `stale`; see reconcile_campaigns().
+        """
+        # Keys, and unclaimed campaign IDs (oldest first), by name, for
+        # creations without a recorded ID.
+        keys = dict((creation.name, creation.key) for creation in stale
+                    if not creation.constant_contact_id)
+        unrecorded = dict((name, []) for name in keys)
+        if unrecorded:
+            for summary in self.iter_email_marketing_campaigns(
+                    modified_since=min(creation.created
+                                       for creation in stale) - CLOCK_SKEW):
+                if summary.get('name') in unrecorded:
+                    unrecorded[summary['name']].append(int(summary['id']))
+            taken = taken_campaign_ids(
+                [constant_contact_id for ids in unrecorded.values()
+                 for constant_contact_id in ids])
+            for name, ids in unrecorded.items():
+                unrecorded[name] = sorted(set(ids) - taken)
+
+        adopted = failed = 0
+        for creation in stale:
+            data = None
+            if creation.constant_contact_id:
+                try:
+                    data = self.get_email_marketing_campaign(
+                        creation.constant_contact_id)
+                except ConstantContactAPIError as exc:
+                    if exc.status_code != 404:
+                        raise
+            elif unrecorded[creation.name]:
+                data = self.get_email_marketing_campaign(
+                    unrecorded[creation.name].pop(0))
+            if data is None:
+                creation.status = CampaignCreation.FAILED
+                creation.claimed = None
+                creation.save()
+                failed += 1
+                continue
+            with timed('db'), transaction.atomic():
+                EmailMarketingCampaign.upsert_data([data])
+                creation.constant_contact_id = data['id']
+                creation.status = CampaignCreation.CREATED
+                creation.save()
+            adopted += 1
+
+        duplicates = dict((constant_contact_id, keys[name])
+                          for name, ids in unrecorded.items()
+                          for constant_contact_id in ids)
+        return adopted, failed, duplicates
+
+    def delete_duplicate_campaigns(self, constant_contact_ids,
+                                   max_workers=None):
+        """Deletes the campaigns with `constant_contact_ids` (possible
+        duplicates reconcile_campaigns() reported, once you've checked
+        them) from Constant Contact, concurrently (see dispatch()).
+
+        IDs an EmailMarketingCampaign or CampaignCreation has are
+        skipped.  Returns the number of campaigns deleted.
+        """
+        constant_contact_ids = set(int(constant_contact_id)
+                                   for constant_contact_id
+                                   in constant_contact_ids)
+        results = self.dispatch(
+            self.delete_email_marketing_campaign,
+            [EmailMarketingCampaign(constant_contact_id=constant_contact_id)
+             for constant_contact_id in sorted(
+                 constant_contact_ids -
+                 taken_campaign_ids(constant_contact_ids))],
+            max_workers)
+        return len([result for result in results
+                    if not isinstance(result, Exception)])
+
+    def iter_results(self, relative_url, params=None):
+        """Yields each result of a GET of `relative_url`, following
+        Constant Contact's next_link from page to page, so only one
+        page is held at a time.
+        """
+        url, params = self.api.join(relative_url), params or {}
+        while True:
+            response = url.get(params=params)
+            self.handle_response_status(response)
+            with timed('parse'):
+                page = serialization.loads(response.content)
+            if isinstance(page, list):  # Not paginated.
+                for result in page:
+                    yield result
+                break
+            for result in page['results']:
+                yield result
+            next_link = page.get('meta', {}).get(
+                'pagination', {}).get('next_link')
+            if not next_link:
+                break
+            # The next_link carries the rest of the query.
+            url, params = self.api.join(next_link), {}
+
+    def iter_email_marketing_campaigns(self, modified_since=None,
+                                       status='ALL', limit=50):
+        """Yields (summary) JSON for each email marketing campaign,
+        fetching a page of `limit` at a time.
+
+        `modified_since` is a datetime or an ISO-8601 string; if given,
+        only campaigns modified since then are yielded.
+        """
+        params = {'status': status, 'limit': limit}
+        if modified_since:
+            params['modified_since'] = iso_8601(modified_since)
+        return self.iter_results(self.EMAIL_MARKETING_CAMPAIGN_URL, params)
+
+    def iter_contacts(self, modified_since=None, status='ALL', email=None,
+                      limit=500):
+        """Yields JSON for each contact, fetching a page of `limit`
+        (at most 500) at a time.
+
+        `modified_since` is a datetime or an ISO-8601 string; if given,
+        only contacts modified since then are yielded.  `email` finds
+        the contact with that address.
+        """
+        params = {'status': status, 'limit': limit}
+        if modified_since:
+            params['modified_since'] = iso_8601(modified_since)
+        if email:
+            params['email'] = email
+        return self.iter_results(self.CONTACTS_URL, params)
+
+    def iter_lists(self, modified_since=None):
+        """Yields JSON for each contact list."""
+        params = {}
+        if modified_since:
+            params['modified_since'] = iso_8601(modified_since)
+        return self.iter_results(self.LISTS_URL, params)
+
+    def new_list(self, name, status='ACTIVE'):
+        """Creates a contact list; returns Constant Contact's JSON for
+        it.
+        """
+        return self.post_json(self.LISTS_URL, {'name': name,
+                                               'status': status})
+
+    def add_contacts(self, contacts, lists, column_names=None,
+                     batch_size=ADD_CONTACTS_BATCH_SIZE):
+        """Adds (or updates) `contacts` and adds them to `lists` (list
+        IDs), with bulk activities/addcontacts imports of `batch_size`
+        contacts each, rather than one request per contact.
+
+        Each of `contacts` is a dict in Constant Contact's import_data
+        format, e.g.
+
+            {'email_addresses': ['jo@example.com'], 'first_name': 'Jo'}
+
+        `contacts` can be any iterable; only one batch is held at a
+        time.  `column_names` defaults to the columns for the keys used
+        (see IMPORT_COLUMN_NAMES); pass it when importing addresses or
+        custom fields.
+
+        Returns Constant Contact's JSON for each activity (import job)
+        started; see get_activity().
+        """
+        lists = [str(list_id) for list_id in lists]
+        activities = []
+        for batch in batches(contacts, batch_size):
+            import_data = []
+            keys = []
+            for contact in batch:
+                contact = dict(contact)
+                if isinstance(contact.get('email_addresses'),
+                              string_types):
+                    contact['email_addresses'] = [
+                        contact['email_addresses']]
+                keys.extend(key for key in contact if key not in keys)
+                import_data.append(contact)
+            activities.append(self.post_json(
+                self.ADD_CONTACTS_URL,
+                {'import_data': import_data,
+                 'lists': lists,
+                 'column_names': column_names or [
+                     IMPORT_COLUMN_NAMES.get(
+                         key, key.upper().replace('_', ' '))
+                     for key in keys]}))
+        return activities
+
+    def get_activity(self, activity_id):
+        """Returns Constant Contact's JSON for an activity (e.g. a bulk
+        import), including its status.
+        """
+        response = self.api.join(
+            '/'.join([self.ACTIVITIES_URL, str(activity_id)])).get()
+        self.handle_response_status(response)
+        with timed('parse'):
+            return serialization.loads(response.content)
+
+    def sync_campaigns(self, full=False, batch_size=100):
+        """Pulls email marketing campaigns from Constant Contact into
+        EmailMarketingCampaigns.
+
+        Only campaigns modified since the last successful sync are
+        fetched, unless `full` is True.  Rows are created or updated
+        `batch_size` at a time (see EmailMarketingCampaign.upsert_data()).
+        Returns the number of campaigns synced.
+        """
+        checkpoint, _ = SyncCheckpoint.objects.get_or_create(
+            key=self.EMAIL_MARKETING_CAMPAIGN_URL)
+        # Anything modified while we're syncing will be picked up next
+        # time.  Campaigns modified within CLOCK_SKEW before we started
+        # are fetched again, in case our clock is ahead; upserting them
+        # twice is harmless.
+        started = iso_8601(timezone.now() - CLOCK_SKEW)
+        modified_since = None if full else (checkpoint.value or None)
+
+        count = 0
+        for batch in batches(self.iter_email_marketing_campaigns(
+                modified_since=modified_since), batch_size):
+            with timed('db'):
+                count += EmailMarketingCampaign.upsert_data(batch)
+
+        checkpoint.value = started
+        checkpoint.save()
+        return count
+
+    def tracking_url(self, email_marketing_campaign, activity):
+        return '/'.join([self.EMAIL_MARKETING_CAMPAIGN_URL,
+                         str(email_marketing_campaign.constant_contact_id),
+                         'tracking', activity])
+
+    def iter_tracking(self, email_marketing_campaign, activity,
+                      created_since=None, limit=500):
+        """Yields JSON for each `activity` ('opens', 'clicks', ...; see
+        TrackingEvent.ACTIVITIES) tracked for an email marketing
+        campaign, fetching a page of `limit` (at most 500) at a time.
+        """
+        params = {'limit': limit}
+        if created_since:
+            params['created_since'] = iso_8601(created_since)
+        return self.iter_results(
+            self.tracking_url(email_marketing_campaign, activity), params)
+
+    def sync_tracking(self, email_marketing_campaign, activities=None,
+                      batch_size=500):
+        """Pulls an email marketing campaign's tracking activities (all
+        of TrackingEvent.ACTIVITIES, by default) into TrackingEvents,
+        then updates its TrackingSummary.
+
+        Each activity picks up from the latest event stored last time
+        (kept in a SyncCheckpoint).  Events are saved `batch_size` at a
+        time, and events already stored are skipped, so an interrupted
+        sync can be run again.  Returns the number of new events.
+        """
+        count = 0
+        for activity in activities or TrackingEvent.ACTIVITIES:
+            activity_type, date_key = TrackingEvent.ACTIVITIES[activity]
+            checkpoint, _ = SyncCheckpoint.objects.get_or_create(
+                key=self.tracking_url(email_marketing_campaign, activity))
+            created_since = checkpoint.value or None
+
+            # Events come newest first, so the checkpoint is only saved
+            # once all of them are stored.  Events at the checkpoint
+            # itself may be stored already -- or, if a sync was
+            # interrupted before saving one, any events at all.
+            stored = TrackingEvent.objects.filter(
+                email_marketing_campaign=email_marketing_campaign,
+                activity_type=activity_type)
+            if created_since:
+                stored = stored.filter(
+                    date__gte=parse_timestamp(created_since))
+            seen = set(stored.values_list('contact_id', 'date', 'link_id'))
+
+            latest = latest_date = None
+            for batch in batches(self.iter_tracking(
+                    email_marketing_campaign, activity,
+                    created_since=created_since), batch_size):
+                events = []
+                for data in batch:
+                    event = TrackingEvent.from_data(
+                        email_marketing_campaign, activity_type,
+                        data, date_key)
+                    if event.key() not in seen:
+                        events.append(event)
+                    if event.date and (latest_date is None or
+                                       event.date > latest_date):
+                        latest, latest_date = data[date_key], event.date
+                with timed('db'):
+                    TrackingEvent.objects.bulk_create(events)
+                count += len(events)
+
+            if latest:
+                checkpoint.value = latest
+                checkpoint.save()
+
+        with timed('db'):
+            TrackingSummary.update(email_marketing_campaign)
+        return count
+
+    def preview_email_marketing_campaign(self, email_marketing_campaign,
+                                         use_cache=True):
         """Returns HTML and text previews of an EmailMarketingCampaign.
+
+        Previews are cached until the campaign is modified (see
+        get_cached_preview()); pass use_cache=False to skip the cache.
         """
+        if use_cache:
+            preview = self.get_cached_preview(email_marketing_campaign)
+            if preview is not None:
+                return preview
+
         url = self.api.join('/'.join([
             self.EMAIL_MARKETING_CAMPAIGN_URL,
             str(email_marketing_campaign.constant_contact_id),
             'preview']))
         response = url.get()
         self.handle_response_status(response)
-        return (response.json()['preview_email_content'],
-                response.json()['preview_text_content'])
+        with timed('parse'):
+            data = serialization.loads(response.content)
+        preview = (data['preview_email_content'],
+                   data['preview_text_content'])
+
+        if use_cache:
+            self.set_cached_preview(email_marketing_campaign, preview)
+        return preview
+
+    def preview_cache_key(self, email_marketing_campaign):
+        return 'django_constant_contact:preview:{0}'.format(
+            email_marketing_campaign.constant_contact_id)
+
+    def get_cached_preview(self, email_marketing_campaign):
+        """Returns the cached preview of email_marketing_campaign, or
+        None if there isn't one for its current modified_date.
+        """
+        preview_cache = get_preview_cache()
+        if not preview_cache:
+            return None
+        cached = preview_cache.get(
+            self.preview_cache_key(email_marketing_campaign))
+        if (cached and cached['modified_date'] ==
+                email_marketing_campaign.data.get('modified_date')):
+            return tuple(cached['preview'])
+        return None
+
+    def set_cached_preview(self, email_marketing_campaign, preview):
+        preview_cache = get_preview_cache()
+        if preview_cache:
+            preview_cache.set(
+                self.preview_cache_key(email_marketing_campaign),
+                {'modified_date':
+                 email_marketing_campaign.data.get('modified_date'),
+                 'preview': preview},
+                getattr(settings, 'CONSTANT_CONTACT_PREVIEW_CACHE_TIMEOUT',
+                        DEFAULT_PREVIEW_CACHE_TIMEOUT))
+
+    def invalidate_preview(self, email_marketing_campaign):
+        """Drops the cached preview of email_marketing_campaign."""
+        preview_cache = get_preview_cache()
+        if preview_cache:
+            preview_cache.delete(
+                self.preview_cache_key(email_marketing_campaign))
 
 
 class EmailMarketingCampaign(models.Model):
@@ -210,46 +1131,568 @@ class EmailMarketingCampaign(models.Model):
     is stored here as constant_contact_id, with a uniqueness constraint.
     """
     constant_contact_id = models.BigIntegerField(unique=True)
-    data = jsonfield.JSONField()
+    data = CompressedJSONField()
+    # Hash of the payload last sent to Constant Contact; see
+    # payload_fingerprint().
+    payload_fingerprint = models.CharField(max_length=64, blank=True,
+                                           default='')
+    # Copied out of `data` by pre_save(), so they can be queried.
+    name = models.CharField(max_length=255, blank=True, default='',
+                            db_index=True)
+    status = models.CharField(max_length=20, blank=True, default='',
+                              db_index=True)
+    modified_date = models.DateTimeField(null=True, blank=True,
+                                         db_index=True)
+    last_run_date = models.DateTimeField(null=True, blank=True,
+                                         db_index=True)
+
+    # Fields pre_save() copies out of `data` (see data_fields()).
+    DATA_FIELDS = ('name', 'status', 'modified_date', 'last_run_date')
+
+    # Fields bulk_update_data() saves.
+    BULK_UPDATE_FIELDS = ('data', 'payload_fingerprint') + DATA_FIELDS
+
+    # Bulky keys of `data` that pre_save() moves to an
+    # EmailMarketingCampaignContent when content is split.
+    CONTENT_FIELDS = ('email_content', 'text_content')
+
+    @property
+    def content_data(self):
+        """The CONTENT_FIELDS split off from `data`, loaded on first
+        access; {} if there are none.
+        """
+        try:
+            return self.content.data
+        except EmailMarketingCampaignContent.DoesNotExist:
+            return {}
+
+    @property
+    def full_data(self):
+        """`data`, with any content split off from it put back."""
+        data = dict(self.content_data)
+        data.update(self.data)
+        return data
+
+    @classmethod
+    def bulk_create_data(cls, email_marketing_campaigns):
+        """Saves many new EmailMarketingCampaigns with one bulk_create().
+
+        Returns a dict of the saved EmailMarketingCampaigns, keyed by
+        constant_contact_id.
+        """
+        email_marketing_campaigns = list(email_marketing_campaigns)
+        # bulk_create() doesn't send pre_save.
+        for email_marketing_campaign in email_marketing_campaigns:
+            cls.pre_save(cls, email_marketing_campaign)
+        cls.objects.bulk_create(email_marketing_campaigns)
+
+        # Not every database gives bulk_create()d objects a pk, so
+        # fetch them back.
+        saved = dict(
+            (email_marketing_campaign.constant_contact_id,
+             email_marketing_campaign)
+            for email_marketing_campaign in
+            cls.objects.filter(constant_contact_id__in=[
+                c.constant_contact_id for c in email_marketing_campaigns]))
+        # Hand any content pre_save() split off to the fetched objects.
+        for email_marketing_campaign in email_marketing_campaigns:
+            if hasattr(email_marketing_campaign, '_split_content'):
+                saved_campaign = saved[
+                    int(email_marketing_campaign.constant_contact_id)]
+                saved_campaign._split_content = (
+                    email_marketing_campaign._split_content)
+        cls.save_content(saved.values())
+        return saved
+
+    @classmethod
+    def upsert_data(cls, campaign_data):
+        """Merges Constant Contact's JSON for each of `campaign_data`
+        into the matching EmailMarketingCampaign, creating any that
+        don't exist yet.
+
+        Takes two queries, plus the writes.  Returns the number of
+        campaigns saved.
+        """
+        campaign_data = dict((int(data['id']), data)
+                             for data in campaign_data)
+        existing = list(cls.objects.filter(
+            constant_contact_id__in=list(campaign_data)))
+        for email_marketing_campaign in existing:
+            email_marketing_campaign.data.update(campaign_data.pop(
+                email_marketing_campaign.constant_contact_id))
+        cls.bulk_update_data(existing)
+        cls.bulk_create_data([cls(data=data)
+                              for data in campaign_data.values()])
+        return len(existing) + len(campaign_data)
+
+    @classmethod
+    def apply_changes(cls, changes):
+        """Merges each of `changes` (changed fields of a campaign, with
+        its `id`, as in a webhook notification) into the matching
+        EmailMarketingCampaign's data.
+
+        Changes older (by modified_date) than what's saved, and changes
+        to campaigns that aren't here, are ignored.  Takes one query
+        (on the constant_contact_id index) and one UPDATE.  Returns the
+        number of campaigns saved.
+        """
+        changes = dict((int(change['id']), change) for change in changes)
+        if not changes:
+            return 0
+        updated = []
+        for email_marketing_campaign in cls.objects.filter(
+                constant_contact_id__in=list(changes)):
+            change = changes[email_marketing_campaign.constant_contact_id]
+            modified_date = parse_timestamp(change.get('modified_date'))
+            if (modified_date and email_marketing_campaign.modified_date and
+                    modified_date < email_marketing_campaign.modified_date):
+                continue
+            email_marketing_campaign.data.update(change)
+            updated.append(email_marketing_campaign)
+        cls.bulk_update_data(updated)
+        return len(updated)
+
+    @classmethod
+    def bulk_update_data(cls, email_marketing_campaigns, batch_size=500):
+        """Saves `data` (and the other BULK_UPDATE_FIELDS) for many
+        EmailMarketingCampaigns.
+
+        Issues one UPDATE ... SET field = CASE ... per `batch_size`
+        campaigns, rather than one per campaign.  (Like the
+        bulk_update() that Django grows in 2.2.)  Signals aren't sent,
+        but the DATA_FIELDS are copied out of `data` as pre_save() does.
+        """
+        email_marketing_campaigns = list(email_marketing_campaigns)
+        for email_marketing_campaign in email_marketing_campaigns:
+            cls.pre_save(cls, email_marketing_campaign)
+        with transaction.atomic():
+            for start in range(0, len(email_marketing_campaigns), batch_size):
+                batch = email_marketing_campaigns[start:start + batch_size]
+                updates = {}
+                for field_name in cls.BULK_UPDATE_FIELDS:
+                    field = cls._meta.get_field(field_name)
+                    cases = [models.When(pk=email_marketing_campaign.pk,
+                                         then=models.Value(
+                                             getattr(email_marketing_campaign,
+                                                     field.attname),
+                                             output_field=field))
+                             for email_marketing_campaign in batch]
+                    updates[field.attname] = models.Case(*cases,
+                                                         output_field=field)
+                cls.objects.filter(pk__in=[c.pk for c in batch]).update(
+                    **updates)
+            cls.save_content(email_marketing_campaigns)
+
+    @classmethod
+    def save_content(cls, email_marketing_campaigns):
+        """Saves the content pre_save() split off from each of
+        `email_marketing_campaigns` (if any), replacing what was
+        saved before.
+        """
+        split = [email_marketing_campaign
+                 for email_marketing_campaign in email_marketing_campaigns
+                 if hasattr(email_marketing_campaign, '_split_content')]
+        if not split:
+            return
+        EmailMarketingCampaignContent.objects.filter(
+            email_marketing_campaign__in=[c.pk for c in split]).delete()
+        contents = [
+            EmailMarketingCampaignContent(
+                email_marketing_campaign=email_marketing_campaign,
+                data=email_marketing_campaign.__dict__.pop('_split_content'))
+            for email_marketing_campaign in split]
+        EmailMarketingCampaignContent.objects.bulk_create(contents)
+        for content in contents:
+            content.email_marketing_campaign.content = content
+
+    @classmethod
+    def delete_content(cls, email_marketing_campaigns):
+        """Deletes the content split off from each of
+        `email_marketing_campaigns`, if any.
+        """
+        EmailMarketingCampaignContent.objects.filter(
+            email_marketing_campaign__in=[
+                c.pk for c in email_marketing_campaigns]).delete()
 
     @classmethod
     def pre_save(cls, sender, instance, *args, **kwargs):
-        """Pull constant_contact_id out of data.
+        """Pull constant_contact_id, and the DATA_FIELDS, out of data.
         """
         instance.constant_contact_id = str(instance.data['id'])
+        for field_name, value in data_fields(instance.data).items():
+            setattr(instance, field_name, value)
+        if getattr(settings, 'CONSTANT_CONTACT_SPLIT_CONTENT', False):
+            content = dict((key, instance.data.pop(key))
+                           for key in cls.CONTENT_FIELDS
+                           if key in instance.data)
+            if content:
+                instance._split_content = content
+
+    @classmethod
+    def post_save(cls, sender, instance, *args, **kwargs):
+        """Saves the content pre_save() split off, if it did.
+        """
+        cls.save_content([instance])
 
     @classmethod
     def pre_delete(cls, sender, instance, *args, **kwargs):
         """Deletes the CC email marketing campaign associated with me.
+
+        If settings.CONSTANT_CONTACT_DEFER_DELETES is True, the delete
+        is queued as a RemoteDeletion instead, in the same transaction
+        as this one; see ConstantContact.process_remote_deletions().
         """
+        if getattr(settings, 'CONSTANT_CONTACT_DEFER_DELETES', False):
+            RemoteDeletion.objects.create(
+                constant_contact_id=instance.constant_contact_id)
+            return
         cc = ConstantContact()
         response = cc.delete_email_marketing_campaign(instance)
         response.raise_for_status()
 
+
+class EmailMarketingCampaignContent(models.Model):
+    """The bulky parts of an EmailMarketingCampaign's `data` (the
+    email and text content), when settings.CONSTANT_CONTACT_SPLIT_CONTENT
+    is True.
+
+    Kept out of the EmailMarketingCampaign's row so listing campaigns
+    doesn't load and decode their content; see
+    EmailMarketingCampaign.content_data and full_data.
+    """
+    email_marketing_campaign = models.OneToOneField(
+        EmailMarketingCampaign, primary_key=True, related_name='content',
+        on_delete=models.CASCADE)
+    data = CompressedJSONField()
+
+    def __str__(self):
+        return str(self.email_marketing_campaign_id)
+
+
+class CampaignSchedule(models.Model):
+    """An email marketing campaign to be scheduled at Constant Contact
+    (a job).
+
+    Written by ConstantContact.queue_schedules(); run by
+    ConstantContact.process_schedules().
+    """
+    PENDING = 'PENDING'
+    SCHEDULED = 'SCHEDULED'
+    FAILED = 'FAILED'
+    STATUS_CHOICES = ((PENDING, 'Pending'),
+                      (SCHEDULED, 'Scheduled'),
+                      (FAILED, 'Failed'))
+
+    email_marketing_campaign = models.ForeignKey(
+        EmailMarketingCampaign, related_name='schedules',
+        on_delete=models.CASCADE)
+    scheduled_date = models.DateTimeField(db_index=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES,
+                              default=PENDING, db_index=True)
+    # Constant Contact's ID for the schedule, once it's made.
+    schedule_id = models.CharField(max_length=50, blank=True, default='')
+    created = models.DateTimeField(auto_now_add=True)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt = models.DateTimeField(null=True, blank=True,
+                                        db_index=True)
+    last_error = models.TextField(blank=True, default='')
+
+    def __str__(self):
+        return '{0} at {1}'.format(self.email_marketing_campaign_id,
+                                   self.scheduled_date)
+
+
+class RemoteDeletion(models.Model):
+    """An email marketing campaign waiting to be deleted from
+    Constant Contact (an outbox).
+
+    Written by EmailMarketingCampaign.pre_delete when deletes are
+    deferred; drained by ConstantContact.process_remote_deletions().
+    """
+    constant_contact_id = models.BigIntegerField()
+    created = models.DateTimeField(auto_now_add=True)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt = models.DateTimeField(null=True, blank=True,
+                                        db_index=True)
+    last_error = models.TextField(blank=True, default='')
+
+    def __str__(self):
+        return str(self.constant_contact_id)
+
+
+class CampaignCreation(models.Model):
+    """An email marketing campaign being created at Constant Contact,
+    under an idempotency key.
+
+    Written (PENDING) by ConstantContact.create_email_marketing_campaign_once()
+    before it POSTs, and marked CREATED when the EmailMarketingCampaign
+    is saved.  A stale PENDING one means a create was interrupted;
+    ConstantContact.reconcile_campaigns() settles it.  `claimed` is
+    when the create (or reconciliation) working on it began.
+    """
+    PENDING = 'PENDING'
+    CREATED = 'CREATED'
+    FAILED = 'FAILED'
+    STATUS_CHOICES = ((PENDING, 'Pending'),
+                      (CREATED, 'Created'),
+                      (FAILED, 'Failed'))
+
+    key = models.CharField(max_length=64, unique=True)
+    name = models.CharField(max_length=255, db_index=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES,
+                              default=PENDING, db_index=True)
+    # Constant Contact's ID for the campaign, once it's known.
+    constant_contact_id = models.BigIntegerField(null=True, blank=True)
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+    claimed = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return self.key
+
+    def claim(self):
+        """Claims this creation for the caller, unless it's CREATED or
+        claimed by someone else within CREATION_CLAIM_TIMEOUT.  Returns
+        whether the claim was made.
+
+        One conditional UPDATE, so of concurrent callers only one wins.
+        """
+        now = timezone.now()
+        claimed = CampaignCreation.objects.filter(pk=self.pk).exclude(
+            status=CampaignCreation.CREATED).filter(
+                models.Q(claimed__isnull=True) |
+                models.Q(claimed__lt=now - CREATION_CLAIM_TIMEOUT)).update(
+                    claimed=now)
+        if claimed:
+            self.claimed = now
+        return bool(claimed)
+
+    def release(self):
+        """Gives up a claim made by claim()."""
+        CampaignCreation.objects.filter(pk=self.pk).update(claimed=None)
+        self.claimed = None
+
+
+class TrackingEvent(models.Model):
+    """One tracked activity -- a send, open, click, forward,
+    unsubscribe or bounce -- for an email marketing campaign.
+
+    Pulled in by ConstantContact.sync_tracking().
+    """
+    # Tracking endpoint: (activity_type, key of the event's date).
+    ACTIVITIES = OrderedDict([
+        ('sends', ('EMAIL_SEND', 'send_date')),
+        ('opens', ('EMAIL_OPEN', 'open_date')),
+        ('clicks', ('EMAIL_CLICK', 'click_date')),
+        ('forwards', ('EMAIL_FORWARD', 'forward_date')),
+        ('unsubscribes', ('EMAIL_UNSUBSCRIBE', 'unsubscribe_date')),
+        ('bounces', ('EMAIL_BOUNCE', 'bounce_date')),
+    ])
+
+    email_marketing_campaign = models.ForeignKey(
+        EmailMarketingCampaign, related_name='tracking_events',
+        on_delete=models.CASCADE)
+    activity_type = models.CharField(max_length=20)
+    contact_id = models.BigIntegerField(null=True, db_index=True)
+    email_address = models.CharField(max_length=254, blank=True, default='')
+    date = models.DateTimeField(null=True)
+    # Clicks only.
+    link_id = models.CharField(max_length=50, blank=True, default='')
+    # Bounces only.
+    bounce_code = models.CharField(max_length=10, blank=True, default='')
+
+    class Meta:
+        index_together = [('email_marketing_campaign', 'activity_type',
+                           'date')]
+
+    @classmethod
+    def from_data(cls, email_marketing_campaign, activity_type, data,
+                  date_key):
+        """Returns an (unsaved) TrackingEvent for Constant Contact's
+        JSON for an event.
+        """
+        contact_id = data.get('contact_id')
+        return cls(email_marketing_campaign=email_marketing_campaign,
+                   activity_type=activity_type,
+                   contact_id=int(contact_id) if contact_id else None,
+                   email_address=(data.get('email_address') or '')[:254],
+                   date=parse_timestamp(data.get(date_key)),
+                   link_id=str(data.get('link_id') or ''),
+                   bounce_code=str(data.get('bounce_code') or ''))
+
+    def key(self):
+        """What tells this event from others of its type."""
+        return (self.contact_id, self.date, self.link_id)
+
+    def __str__(self):
+        return '{0} {1}'.format(self.activity_type, self.email_address)
+
+
+class TrackingSummary(models.Model):
+    """Counts of an email marketing campaign's TrackingEvents, kept up
+    to date by ConstantContact.sync_tracking(), for reports.
+    """
+    email_marketing_campaign = models.OneToOneField(
+        EmailMarketingCampaign, primary_key=True,
+        related_name='tracking_summary', on_delete=models.CASCADE)
+    sends = models.PositiveIntegerField(default=0)
+    opens = models.PositiveIntegerField(default=0)
+    unique_opens = models.PositiveIntegerField(default=0)
+    clicks = models.PositiveIntegerField(default=0)
+    unique_clicks = models.PositiveIntegerField(default=0)
+    forwards = models.PositiveIntegerField(default=0)
+    unsubscribes = models.PositiveIntegerField(default=0)
+    bounces = models.PositiveIntegerField(default=0)
+    modified = models.DateTimeField(auto_now=True)
+
+    @classmethod
+    def update(cls, email_marketing_campaign):
+        """Recounts an email marketing campaign's TrackingEvents, in
+        the database; returns its TrackingSummary.
+        """
+        counts = dict(
+            (row['activity_type'], row)
+            for row in TrackingEvent.objects.filter(
+                email_marketing_campaign=email_marketing_campaign).values(
+                    'activity_type').annotate(
+                        total=models.Count('pk'),
+                        unique=models.Count('contact_id', distinct=True)))
+        summary = cls(email_marketing_campaign=email_marketing_campaign)
+        for activity, (activity_type, _) in TrackingEvent.ACTIVITIES.items():
+            row = counts.get(activity_type, {})
+            setattr(summary, activity, row.get('total', 0))
+            if hasattr(summary, 'unique_' + activity):
+                setattr(summary, 'unique_' + activity, row.get('unique', 0))
+        summary.save()
+        return summary
+
+    def __str__(self):
+        return str(self.email_marketing_campaign_id)
+
+
+class SyncCheckpoint(models.Model):
+    """Where a sync from Constant Contact left off.
+
+    `key` names the sync (usually the API path synced); `value` is
+    whatever that sync needs to pick up where it stopped -- a
+    timestamp, or a pagination cursor.
+    """
+    key = models.CharField(max_length=255, unique=True)
+    value = models.TextField(blank=True, default='')
+    modified = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.key
+
+
 pre_save.connect(EmailMarketingCampaign.pre_save,
                  sender=EmailMarketingCampaign)
 
+post_save.connect(EmailMarketingCampaign.post_save,
+                  sender=EmailMarketingCampaign)
+
 pre_delete.connect(EmailMarketingCampaign.pre_delete,
                    sender=EmailMarketingCampaign)
 
 
-def work_around(content):
-    """A work-around for a Constant Contact known issue.
+def taken_campaign_ids(constant_contact_ids):
+    """Returns the set of `constant_contact_ids` that an
+    EmailMarketingCampaign or a CampaignCreation has.
+    """
+    constant_contact_ids = [int(constant_contact_id)
+                            for constant_contact_id in constant_contact_ids]
+    taken = set()
+    for model in (EmailMarketingCampaign, CampaignCreation):
+        taken.update(model.objects.filter(
+            constant_contact_id__in=constant_contact_ids).values_list(
+                'constant_contact_id', flat=True))
+    return set(int(constant_contact_id) for constant_contact_id in taken)
+
+
+def payload_fingerprint(data):
+    """Returns a hash of an email marketing campaign payload.
+    """
+    return hashlib.sha256(
+        json.dumps(data, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def trim_content(data):
+    """Returns Constant Contact's JSON for a campaign without its
+    content (EmailMarketingCampaign.CONTENT_FIELDS).
+
+    The API can't be asked to leave the content it echoes back out of
+    its responses, but it needn't be saved.
+    """
+    return dict((key, value) for key, value in data.items()
+                if key not in EmailMarketingCampaign.CONTENT_FIELDS)
+
+
+def get_preview_cache():
+    """Returns the Django cache previews are kept in, or None if
+    previews aren't cached.
+    """
+    alias = getattr(settings, 'CONSTANT_CONTACT_PREVIEW_CACHE', 'default')
+    if not alias:
+        return None
+    return caches[alias]
 
-    ‎09-06-2016 02:28 PM, from Constant Contact support;
 
-    >> It appears you are running into a known issue with creating
-       emails with unsupported characters within them. In looking at
-       the HTML that came over for this email, I found an instancea of
-       a "smart" or "curly" apostrophe. Though it appears similar ( ’
-       vs ' ), only the standard apostrophe (the second one) is
-       available to be used.
+def iso_8601(timestamp):
+    """Formats a datetime the way Constant Contact likes.
 
-    >> While this should return an error, the known issue is that we
-       are creating the email with these special characters
-       anyway. This issue has been brought to the attention of our
-       engineering and development teams for investigation. The
-       workaround at this point is remove any of these unsupported
-       characters from the code before submitting.
+    Naive datetimes are taken to be UTC if settings.USE_TZ is set, and
+    in the default time zone (as Django stores them) if not.  Strings
+    are assumed to be formatted already.
     """
-    return content.decode("utf-8").replace(u"\u2019", "'").encode("utf-8")
+    if isinstance(timestamp, datetime.datetime):
+        if timestamp.tzinfo is None and not settings.USE_TZ:
+            timestamp = timezone.make_aware(timestamp,
+                                            timezone.get_default_timezone())
+        if timestamp.tzinfo is not None:
+            timestamp = timestamp.astimezone(utc).replace(tzinfo=None)
+        return timestamp.strftime('%Y-%m-%dT%H:%M:%S.000Z')
+    return timestamp
+
+
+def parse_timestamp(timestamp):
+    """Parses a timestamp from Constant Contact into a datetime, or
+    None.
+
+    The datetime is aware if settings.USE_TZ is set, else naive, in
+    the default time zone.
+    """
+    if not timestamp:
+        return None
+    timestamp = dateparse.parse_datetime(timestamp)
+    if timestamp is None:
+        return None
+    if timezone.is_naive(timestamp):
+        timestamp = timestamp.replace(tzinfo=utc)
+    if not settings.USE_TZ:
+        timestamp = timezone.make_naive(timestamp,
+                                        timezone.get_default_timezone())
+    return timestamp
+
+
+def data_fields(data):
+    """Returns the values of EmailMarketingCampaign.DATA_FIELDS in
+    `data` (Constant Contact's JSON for a campaign), keyed by field
+    name.
+    """
+    return {
+        'name': (data.get('name') or '')[:255],
+        'status': (data.get('status') or '')[:20],
+        'modified_date': parse_timestamp(data.get('modified_date')),
+        'last_run_date': parse_timestamp(data.get('last_run_date')),
+    }
+
+
+def batches(iterable, size):
+    """Yields lists of up to `size` items from `iterable`."""
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
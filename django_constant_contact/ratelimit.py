@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""Client-side throttling and retries for the Constant Contact API.
+
+Constant Contact allows a limited number of queries per second, and
+answers anything over that with a 429.  Requests go through a rate
+limiter (a token bucket, by default) before they're sent, and 429s
+and 5xxs are retried with jittered exponential backoff.
+
+Settings (all optional):
+
+    CONSTANT_CONTACT_QUERIES_PER_SECOND  Sustained rate (default 4).
+                                         None or 0 turns limiting off.
+    CONSTANT_CONTACT_QUERIES_BURST       Bucket size (default: the rate).
+    CONSTANT_CONTACT_RATE_LIMITER        Dotted path to the limiter
+                                         class (default LocalRateLimiter;
+                                         use CacheRateLimiter to share
+                                         the quota between processes).
+    CONSTANT_CONTACT_RATE_LIMITER_OPTIONS
+                                         Extra kwargs for the limiter.
+    CONSTANT_CONTACT_MAX_RETRIES         Retries per request (default 3).
+    CONSTANT_CONTACT_RETRY_BACKOFF       Base backoff, in seconds
+                                         (default 0.5).
+    CONSTANT_CONTACT_RETRY_MAX_BACKOFF   Backoff cap, in seconds
+                                         (default 30).
+"""
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+
+from .singleton import ProcessSingleton
+
+DEFAULT_QUERIES_PER_SECOND = 4
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_RETRY_BACKOFF = 0.5
+DEFAULT_RETRY_MAX_BACKOFF = 30
+DEFAULT_RATE_LIMITER = 'django_constant_contact.ratelimit.LocalRateLimiter'
+
+# Methods that are safe to resend after a 5xx.  (Anything may be
+# resent after a 429, since Constant Contact didn't process it.)
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE')
+
+monotonic = getattr(time, 'monotonic', time.time)
+
+
+class LocalRateLimiter(object):
+    """A token bucket shared by all threads in this process.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst or rate)
+        self.tokens = self.capacity
+        self.updated = monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        """Takes a token if there is one.
+
+        Returns 0 if a token was taken, else the number of seconds
+        to wait before trying again.
+        """
+        with self.lock:
+            now = monotonic()
+            self.tokens = min(self.capacity,
+                              self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self):
+        """Blocks until a request may be made."""
+        while True:
+            wait = self.reserve()
+            if not wait:
+                return
+            time.sleep(wait)
+
+
+class CacheRateLimiter(LocalRateLimiter):
+    """A rate limiter shared by every process using the same Django cache.
+
+    Counts requests per one-second window with cache.incr(), so it
+    needs a cache with atomic increments (memcached, redis) to be
+    exact.  `burst` is ignored.
+    """
+
+    def __init__(self, rate, burst=None, cache_alias='default',
+                 key_prefix='django_constant_contact:ratelimit'):
+        self.rate = int(rate)
+        self.cache = caches[cache_alias]
+        self.key_prefix = key_prefix
+
+    def reserve(self):
+        now = time.time()
+        window = int(now)
+        key = '%s:%d' % (self.key_prefix, window)
+        self.cache.add(key, 0, timeout=2)
+        try:
+            count = self.cache.incr(key)
+        except ValueError:
+            # Expired between add() and incr(); we're first in.
+            self.cache.add(key, 1, timeout=2)
+            count = 1
+        if count <= self.rate:
+            return 0
+        return window + 1 - now
+
+
+def build_rate_limiter():
+    """Returns a new rate limiter configured from settings, or None
+    if rate limiting is off.
+    """
+    rate = getattr(settings, 'CONSTANT_CONTACT_QUERIES_PER_SECOND',
+                   DEFAULT_QUERIES_PER_SECOND)
+    if not rate:
+        return None
+    limiter_class = import_string(
+        getattr(settings, 'CONSTANT_CONTACT_RATE_LIMITER',
+                DEFAULT_RATE_LIMITER))
+    options = getattr(settings, 'CONSTANT_CONTACT_RATE_LIMITER_OPTIONS', {})
+    return limiter_class(
+        rate,
+        burst=getattr(settings, 'CONSTANT_CONTACT_QUERIES_BURST', None),
+        **options)
+
+
+_rate_limiter = ProcessSingleton(build_rate_limiter)
+get_rate_limiter = _rate_limiter.get
+reset_rate_limiter = _rate_limiter.reset
+
+
+def retry_delay(method, status_code, headers, attempt):
+    """Returns how long to wait before retrying a request, or None
+    if it shouldn't be retried.
+
+    `attempt` counts retries made so far.  The delay is "full jitter"
+    exponential backoff, but never less than a Retry-After header asks.
+    """
+    max_retries = getattr(settings, 'CONSTANT_CONTACT_MAX_RETRIES',
+                          DEFAULT_MAX_RETRIES)
+    if attempt >= max_retries:
+        return None
+    if status_code == 429:
+        pass
+    elif 500 <= status_code <= 599 and method.upper() in IDEMPOTENT_METHODS:
+        pass
+    else:
+        return None
+
+    base = getattr(settings, 'CONSTANT_CONTACT_RETRY_BACKOFF',
+                   DEFAULT_RETRY_BACKOFF)
+    cap = getattr(settings, 'CONSTANT_CONTACT_RETRY_MAX_BACKOFF',
+                  DEFAULT_RETRY_MAX_BACKOFF)
+    delay = random.uniform(0, min(cap, base * 2 ** attempt))
+    return max(delay, min(cap, parse_retry_after(headers)))
+
+
+def parse_retry_after(headers):
+    """Returns the seconds a Retry-After header asks us to wait, or 0.
+    """
+    try:
+        return float(headers.get('Retry-After') or 0)
+    except ValueError:  # An HTTP date; not worth parsing.
+        return 0
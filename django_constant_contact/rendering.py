@@ -0,0 +1,625 @@
+# -*- coding: utf-8 -*-
+"""Preparing email content for Constant Contact.
+
+render_email_content() is the pipeline: inline CSS with Premailer
+(through an Inliner, which loads and parses each stylesheet once),
+minify the HTML, and replace characters Constant Contact can't handle
+(smart quotes, dashes, ...).  It's CPU-bound (lxml, BeautifulSoup) and
+holds the GIL, so render() can hand it to a pool of processes, and it
+caches results under a hash of the input HTML, the rendering options
+and the stylesheets it links to, so identical bodies (a campaign
+updated without changing its body, or a template shared by many
+campaigns) are rendered once.  Stylesheets are hashed as the Inliner
+holds them, without fetching them: while one isn't held (or has
+expired; see CONSTANT_CONTACT_STYLESHEET_TIMEOUT) the cache is passed
+by, and rendering fetches it.  So after a stylesheet changes, renders
+that used it are replaced once the Inliner refetches it.
+
+CampaignTemplate renders a document once, leaving {{ name }} slots to
+be filled in per campaign (a chapter's address, say), so many
+near-identical campaigns cost one render and a string join each.
+
+Settings (all optional):
+
+    CONSTANT_CONTACT_RENDER_PROCESSES    Size of the process pool that
+                                         renders content (default 0:
+                                         render in the calling thread).
+    CONSTANT_CONTACT_RENDER_CACHE_SIZE   Bytes of rendered content kept
+                                         in the in-process LRU cache
+                                         (default 32 MB; 0 turns the
+                                         cache off).
+    CONSTANT_CONTACT_RENDER_CACHE        Alias of a Django cache to use
+                                         instead of the in-process one
+                                         (default None).
+    CONSTANT_CONTACT_RENDER_CACHE_TIMEOUT
+                                         Seconds entries live in the
+                                         Django cache (default 1 day).
+    CONSTANT_CONTACT_SANITIZE_REPLACEMENTS
+                                         Dict of characters to replace,
+                                         and their replacements
+                                         (default DEFAULT_REPLACEMENTS).
+    CONSTANT_CONTACT_STYLESHEETS         URLs or paths of stylesheets to
+                                         inline into every document
+                                         (default None).
+    CONSTANT_CONTACT_STYLESHEET_TIMEOUT  Seconds fetched stylesheets are
+                                         kept (default 1 hour).
+    CONSTANT_CONTACT_PREMAILER_OPTIONS   Dict of keyword arguments for
+                                         Premailer (default {}).
+"""
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.html import conditional_escape
+from htmlmin.minify import html_minify
+from premailer import Premailer
+
+from .instrumentation import timed
+from .singleton import ProcessSingleton, setting
+from .transport import get_session, get_timeout
+
+try:
+    string_types = basestring  # Python 2
+except NameError:
+    string_types = str
+
+try:
+    text_type = unicode  # Python 2
+except NameError:
+    text_type = str
+
+logger = logging.getLogger(__name__)
+
+# Bump when rendering changes, so stale renders aren't served.
+PIPELINE_VERSION = 2
+
+DEFAULT_RENDER_CACHE_SIZE = 32 * 1024 * 1024
+DEFAULT_RENDER_CACHE_TIMEOUT = 24 * 60 * 60
+DEFAULT_STYLESHEET_TIMEOUT = 60 * 60
+DEFAULT_MAX_RULES = 256
+
+_LINK_TAG = re.compile(r'<link\b[^>]*>', re.IGNORECASE)
+_ATTRIBUTE = re.compile(
+    r'''([\w-]+)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+))''')
+
+
+class InlinerPremailer(Premailer):
+    """A Premailer that gets stylesheets and parsed rules from an
+    Inliner, instead of fetching and parsing them itself.
+    """
+
+    def __init__(self, html, inliner, **kwargs):
+        super(InlinerPremailer, self).__init__(html, **kwargs)
+        self.inliner = inliner
+
+    def _load_external(self, url):
+        return self.inliner.load_stylesheet(
+            url, super(InlinerPremailer, self)._load_external)
+
+    def _load_external_url(self, url):
+        return self.inliner.fetch(url)
+
+    def _parse_style_rules(self, css_body, ruleset_index):
+        return self.inliner.parse_style_rules(
+            css_body, ruleset_index,
+            super(InlinerPremailer, self)._parse_style_rules)
+
+
+class Inliner(object):
+    """Inlines CSS into many documents, loading and parsing each
+    stylesheet once.
+
+    `external_styles` (URLs or paths) and `css_text` are applied to
+    every document, as well as any <style> and <link> in it.  Fetched
+    stylesheets are kept for `stylesheet_timeout` seconds, and the
+    rules parsed out of stylesheets (the slow part) for as long as
+    they're among the last `max_rules` used.  Other keyword arguments
+    are passed on to Premailer.
+    """
+
+    def __init__(self, external_styles=None, css_text=None,
+                 stylesheet_timeout=DEFAULT_STYLESHEET_TIMEOUT,
+                 max_rules=DEFAULT_MAX_RULES, **premailer_options):
+        if isinstance(external_styles, string_types):
+            external_styles = [external_styles]
+        if isinstance(css_text, string_types):
+            css_text = [css_text]
+        self.external_styles = list(external_styles or [])
+        self.css_text = list(css_text or [])
+        self.stylesheet_timeout = stylesheet_timeout
+        self.max_rules = max_rules
+        self.premailer_options = premailer_options
+        self.stylesheets = {}
+        self.rules = OrderedDict()
+        self.lock = threading.Lock()
+
+    def inline(self, html, pretty_print=True):
+        """Returns `html` with its CSS inlined."""
+        premailer = InlinerPremailer(
+            html, self, external_styles=self.external_styles or None,
+            css_text=self.css_text or None, **self.premailer_options)
+        return premailer.transform(pretty_print=pretty_print)
+
+    def fetch(self, url):
+        """Returns the stylesheet at `url`, over the shared session."""
+        response = get_session().get(url, timeout=get_timeout())
+        response.raise_for_status()
+        return response.text
+
+    def load_stylesheet(self, url, load):
+        """Returns the stylesheet at `url` (or path), calling load(url)
+        unless it was loaded less than stylesheet_timeout seconds ago.
+        """
+        css_body = self.held_stylesheet(url)
+        if css_body is not None:
+            return css_body
+        now = time.time()
+        css_body = load(url)
+        with self.lock:
+            self.stylesheets[url] = (now, css_body)
+        return css_body
+
+    def held_stylesheet(self, url):
+        """Returns the stylesheet at `url` (or path) if it was loaded
+        less than stylesheet_timeout seconds ago, else None.
+        """
+        with self.lock:
+            loaded, css_body = self.stylesheets.get(url, (None, None))
+        if loaded is not None and time.time() - loaded < (
+                self.stylesheet_timeout):
+            return css_body
+        return None
+
+    def parse_style_rules(self, css_body, ruleset_index, parse):
+        """Returns Premailer's (rules, leftover) for `css_body`, calling
+        parse(css_body, ruleset_index) unless they're cached.
+        """
+        key = (css_body, ruleset_index)
+        with self.lock:
+            parsed = self.rules.pop(key, None)
+            if parsed is not None:
+                self.rules[key] = parsed  # Now most recently used.
+                return parsed
+        parsed = parse(css_body, ruleset_index)
+        with self.lock:
+            self.rules[key] = parsed
+            while len(self.rules) > self.max_rules:
+                self.rules.popitem(last=False)
+        return parsed
+
+    def stylesheet_urls(self, html):
+        """Returns the URLs (or paths) of the stylesheets inline() would
+        load for `html`: its <link rel="stylesheet">s, then
+        external_styles.
+        """
+        if isinstance(html, bytes):
+            html = html.decode('utf-8', 'replace')
+        urls = []
+        for tag in _LINK_TAG.findall(html):
+            attributes = dict(
+                (match[0].lower(), match[1] or match[2] or match[3])
+                for match in _ATTRIBUTE.findall(tag))
+            if ('stylesheet' in attributes.get('rel', '').lower().split() and
+                    attributes.get('href')):
+                urls.append(attributes['href'])
+        return urls + self.external_styles
+
+    def stylesheet_digest(self, html, load=False):
+        """Returns a hash of the stylesheets inline() would load for
+        `html`, as held now, or None if one of them isn't held (see
+        held_stylesheet()).  With load=True, those that aren't are
+        loaded, as inline() would.
+        """
+        digest = hashlib.sha256()
+        premailer = None
+        for url in self.stylesheet_urls(html):
+            css_body = self.held_stylesheet(url)
+            if css_body is None:
+                if not load:
+                    return None
+                premailer = premailer or InlinerPremailer(
+                    u'', self, **self.premailer_options)
+                css_body = premailer._load_external(url)
+            if not isinstance(css_body, bytes):
+                css_body = css_body.encode('utf-8')
+            digest.update(css_body)
+        return digest.hexdigest()
+
+    def clear(self):
+        with self.lock:
+            self.stylesheets.clear()
+            self.rules.clear()
+
+
+def build_inliner():
+    """Returns a new Inliner configured from settings."""
+    return Inliner(
+        external_styles=setting('CONSTANT_CONTACT_STYLESHEETS'),
+        stylesheet_timeout=setting('CONSTANT_CONTACT_STYLESHEET_TIMEOUT',
+                                   DEFAULT_STYLESHEET_TIMEOUT),
+        **setting('CONSTANT_CONTACT_PREMAILER_OPTIONS', {}))
+
+
+# Resetting it forgets the stylesheets it holds, too.
+_inliner = ProcessSingleton(build_inliner)
+get_inliner = _inliner.get
+reset_inliner = _inliner.reset
+
+
+def inline_css(html, pretty_print=True):
+    """Inlines CSS defined in external style sheets.
+    """
+    return get_inliner().inline(html, pretty_print=pretty_print)
+
+
+# Characters Constant Contact mangles, and what to send instead.
+DEFAULT_REPLACEMENTS = {
+    u'\u2018': u"'",        # left single quotation mark
+    u'\u2019': u"'",        # right single quotation mark (apostrophe)
+    u'\u201a': u"'",        # single low-9 quotation mark
+    u'\u201c': u'"',        # left double quotation mark
+    u'\u201d': u'"',        # right double quotation mark
+    u'\u201e': u'"',        # double low-9 quotation mark
+    u'\u2032': u"'",        # prime
+    u'\u2033': u'"',        # double prime
+    u'\u2013': u'&#8211;',  # en dash
+    u'\u2014': u'&#8212;',  # em dash
+    u'\u2026': u'...',      # horizontal ellipsis
+    u'\u00a0': u'&#160;',   # no-break space
+}
+
+
+class Sanitizer(object):
+    """Replaces characters Constant Contact can't handle, in one pass.
+
+    `replacements` maps each unsupported character (or string) to what
+    to send instead.  sanitize() takes text or UTF-8 bytes and returns
+    the same type, without decoding or re-encoding bytes.
+    """
+
+    def __init__(self, replacements=None):
+        if replacements is None:
+            replacements = DEFAULT_REPLACEMENTS
+        self.replacements = dict(replacements)
+        # Longest first, so multi-character keys win.
+        keys = sorted(self.replacements, key=len, reverse=True)
+        self.text_pattern = re.compile(
+            u'|'.join(re.escape(key) for key in keys) or u'(?!)')
+        self.bytes_replacements = dict(
+            (key.encode('utf-8'), value.encode('utf-8'))
+            for key, value in self.replacements.items())
+        self.bytes_pattern = re.compile(
+            b'|'.join(re.escape(key.encode('utf-8')) for key in keys) or
+            b'(?!)')
+
+    def sanitize(self, content):
+        """Returns (sanitized content, {character: times replaced}).
+        """
+        replaced = {}
+        if isinstance(content, bytes):
+            pattern, replacements = (self.bytes_pattern,
+                                     self.bytes_replacements)
+        else:
+            pattern, replacements = self.text_pattern, self.replacements
+
+        def replace(match):
+            key = match.group(0)
+            replaced[key] = replaced.get(key, 0) + 1
+            return replacements[key]
+
+        content = pattern.sub(replace, content)
+        if replaced and isinstance(content, bytes):
+            replaced = dict((key.decode('utf-8'), count)
+                            for key, count in replaced.items())
+        return content, replaced
+
+
+def build_sanitizer():
+    """Returns a new Sanitizer configured from settings."""
+    return Sanitizer(setting('CONSTANT_CONTACT_SANITIZE_REPLACEMENTS'))
+
+
+_sanitizer = ProcessSingleton(build_sanitizer)
+get_sanitizer = _sanitizer.get
+reset_sanitizer = _sanitizer.reset
+
+
+def work_around(content):
+    """A work-around for a Constant Contact known issue.
+
+    ‎09-06-2016 02:28 PM, from Constant Contact support;
+
+    >> It appears you are running into a known issue with creating
+       emails with unsupported characters within them. In looking at
+       the HTML that came over for this email, I found an instancea of
+       a "smart" or "curly" apostrophe. Though it appears similar ( ’
+       vs ' ), only the standard apostrophe (the second one) is
+       available to be used.
+
+    >> While this should return an error, the known issue is that we
+       are creating the email with these special characters
+       anyway. This issue has been brought to the attention of our
+       engineering and development teams for investigation. The
+       workaround at this point is remove any of these unsupported
+       characters from the code before submitting.
+
+    Curly apostrophes aren't the only such characters; this replaces
+    everything in the Sanitizer's table (see DEFAULT_REPLACEMENTS and
+    CONSTANT_CONTACT_SANITIZE_REPLACEMENTS).  Takes and returns text
+    or UTF-8 bytes.
+    """
+    content, replaced = get_sanitizer().sanitize(content)
+    if replaced:
+        logger.debug('Replaced unsupported characters: %r', replaced)
+    return content
+
+
+def render_email_content(html, inline=True, minify=True, sanitize=True):
+    """Returns `html` ready to send to Constant Contact.
+
+    Steps can be skipped by passing False for `inline` (CSS inlining),
+    `minify` (HTML minification) or `sanitize` (replacing characters
+    Constant Contact can't handle; see Sanitizer).
+
+    This is a plain module-level function, so it can be sent to a
+    process pool.
+    """
+    if inline:
+        with timed('inline', bytes=len(html)):
+            html = inline_css(html)
+    if minify:
+        with timed('minify', bytes=len(html)):
+            html = html_minify(html)
+    if sanitize:
+        with timed('sanitize', bytes=len(html)) as tags:
+            html, replaced = get_sanitizer().sanitize(html)
+            tags['replaced'] = sum(replaced.values())
+        if replaced:
+            logger.debug('Replaced unsupported characters: %r', replaced)
+    return html
+
+
+def render_cache_key(html, load_stylesheets=False, **options):
+    """Returns the cache key for `html` rendered with `options`.
+
+    Covers the content of the stylesheets CSS is inlined from (see
+    Inliner.stylesheet_digest()), not just their URLs.  So as not to
+    fetch anything, returns None if one of them isn't held (or has
+    expired), unless `load_stylesheets`.
+    """
+    inliner = get_inliner()
+    stylesheets = None
+    if options.get('inline', True):
+        stylesheets = inliner.stylesheet_digest(html, load=load_stylesheets)
+        if stylesheets is None:
+            return None
+    if not isinstance(html, bytes):
+        html = html.encode('utf-8')
+    digest = hashlib.sha256(html)
+    digest.update(json.dumps([PIPELINE_VERSION, options,
+                              get_sanitizer().replacements,
+                              inliner.external_styles, inliner.css_text,
+                              inliner.premailer_options, stylesheets],
+                             sort_keys=True, default=repr).encode('utf-8'))
+    return 'django_constant_contact:render:' + digest.hexdigest()
+
+
+class LRURenderCache(object):
+    """An in-process, thread-safe LRU cache, bounded by the total
+    length of the values it holds.
+    """
+
+    def __init__(self, max_size=DEFAULT_RENDER_CACHE_SIZE):
+        self.max_size = max_size
+        self.size = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.pop(key, None)
+            if value is not None:
+                self.entries[key] = value  # Now most recently used.
+            return value
+
+    def set(self, key, value):
+        if len(value) > self.max_size:
+            return
+        with self.lock:
+            old_value = self.entries.pop(key, None)
+            if old_value is not None:
+                self.size -= len(old_value)
+            self.entries[key] = value
+            self.size += len(value)
+            while self.size > self.max_size:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+
+class DjangoRenderCache(object):
+    """Keeps rendered content in a Django cache, so it's shared by
+    every process using that cache.
+    """
+
+    def __init__(self, alias='default', timeout=DEFAULT_RENDER_CACHE_TIMEOUT):
+        self.cache = caches[alias]
+        self.timeout = timeout
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, value):
+        self.cache.set(key, value, self.timeout)
+
+    def clear(self):
+        """Does nothing; we don't own the Django cache."""
+
+
+def build_render_cache():
+    """Returns a new render cache configured from settings, or None
+    if caching is off.
+    """
+    alias = getattr(settings, 'CONSTANT_CONTACT_RENDER_CACHE', None)
+    if alias:
+        return DjangoRenderCache(
+            alias,
+            timeout=getattr(settings, 'CONSTANT_CONTACT_RENDER_CACHE_TIMEOUT',
+                            DEFAULT_RENDER_CACHE_TIMEOUT))
+    max_size = getattr(settings, 'CONSTANT_CONTACT_RENDER_CACHE_SIZE',
+                       DEFAULT_RENDER_CACHE_SIZE)
+    if not max_size:
+        return None
+    return LRURenderCache(max_size)
+
+
+_render_cache = ProcessSingleton(build_render_cache)
+get_render_cache = _render_cache.get
+reset_render_cache = _render_cache.reset
+
+
+def build_render_executor():
+    """Returns a new ProcessPoolExecutor configured from settings, or
+    None if content should be rendered in the calling thread.
+    """
+    processes = getattr(settings, 'CONSTANT_CONTACT_RENDER_PROCESSES', 0)
+    if not processes:
+        return None
+    return ProcessPoolExecutor(max_workers=processes)
+
+
+_render_executor = ProcessSingleton(
+    build_render_executor,
+    close=lambda executor: executor.shutdown(wait=False))
+get_render_executor = _render_executor.get
+reset_render_executor = _render_executor.reset
+
+
+def render_many(htmls, **options):
+    """Renders each of `htmls` with render_email_content(); returns the
+    results, in order.
+
+    PreparedContent (from CampaignTemplate.fill()) is already rendered,
+    and returned as is.  Cached results are reused.  The rest are
+    rendered concurrently by the process pool, if there is one, else
+    one after another in this thread.  If the pool fails (a worker was
+    killed, say) the content is rendered here instead.
+    """
+    htmls = list(htmls)
+    render_cache = get_render_cache()
+    results = [html if isinstance(html, PreparedContent) else None
+               for html in htmls]
+    missing = [i for i, result in enumerate(results) if result is None]
+    if render_cache:
+        keys = dict((i, render_cache_key(htmls[i], **options))
+                    for i in missing)
+        for i in missing:
+            if keys[i]:
+                results[i] = render_cache.get(keys[i])
+        missing = [i for i in missing if results[i] is None]
+
+    executor = get_render_executor()
+    if executor and missing:
+        futures = dict((i, executor.submit(render_email_content,
+                                           htmls[i], **options))
+                       for i in missing)
+        with timed('render', documents=len(missing)):
+            for i, future in futures.items():
+                try:
+                    results[i] = future.result()
+                except Exception:
+                    logger.exception('Rendering in the process pool failed; '
+                                     'rendering in process instead.')
+                    reset_render_executor()
+    for i in missing:
+        if results[i] is None:
+            results[i] = render_email_content(htmls[i], **options)
+        if render_cache:
+            render_cache.set(keys[i] or render_cache_key(
+                htmls[i], load_stylesheets=True, **options), results[i])
+    return results
+
+
+def render(html, **options):
+    """Renders one document; see render_many()."""
+    return render_many([html], **options)[0]
+
+
+class PreparedContent(text_type):
+    """Email content that's already been rendered; render() returns it
+    as is.
+    """
+
+
+SLOT = re.compile(r'\{\{\s*(\w+)\s*\}\}')
+
+# What slots are rendered as: plain words, which inlining, minifying
+# and sanitizing leave alone.
+_SLOT_MARKER = '__cc_slot_{0}__'
+_SLOT_MARKERS = re.compile(r'__cc_slot_(\d+)__')
+
+
+class CampaignTemplate(object):
+    """Email content that's rendered once, and filled in per campaign.
+
+    `html` marks slots as {{ name }}; `options` are render()'s.  fill()
+    returns PreparedContent to pass, as email_content, to
+    ConstantContact's create and update methods:
+
+        template = CampaignTemplate(newsletter_html)
+        for chapter in chapters:
+            constant_contact.new_email_marketing_campaign(
+                email_content=template.fill(address=chapter.address),
+                ...)
+
+    Values are HTML-escaped (unless marked safe) and sanitized, but
+    not CSS-inlined or minified, so HTML values should be simple.
+    """
+
+    def __init__(self, html, **options):
+        self.sanitize = options.get('sanitize', True)
+        self.slots = []
+
+        def mark(match):
+            name = match.group(1)
+            if name not in self.slots:
+                self.slots.append(name)
+            return _SLOT_MARKER.format(self.slots.index(name))
+
+        rendered = render(SLOT.sub(mark, html), **options)
+        parts = _SLOT_MARKERS.split(rendered)
+        # The text between slots, and the index of each slot in self.slots.
+        self.parts = parts[::2]
+        self.positions = [int(index) for index in parts[1::2]]
+
+    def prepare_value(self, value):
+        """Returns `value` escaped and sanitized."""
+        value = text_type(conditional_escape(value))
+        if self.sanitize:
+            value = get_sanitizer().sanitize(value)[0]
+        return value
+
+    def fill(self, **values):
+        """Returns the content with each slot replaced by its value in
+        `values`.  Raises ValueError if a slot has no value.
+        """
+        missing = [name for name in self.slots if name not in values]
+        if missing:
+            raise ValueError('No value for slots: ' + ', '.join(missing))
+        filled = [self.prepare_value(values[name]) for name in self.slots]
+        pieces = [self.parts[0]]
+        for index, part in zip(self.positions, self.parts[1:]):
+            pieces.append(filled[index])
+            pieces.append(part)
+        return PreparedContent(u''.join(pieces))
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""JSON for requests to, and responses from, Constant Contact.
+
+A campaign's payload (and the response, which echoes it) carries its
+whole rendered HTML, so encoding and decoding JSON is a noticeable
+part of each call.  dumps() and loads() use orjson, or else ujson,
+when one is installed, and the json module otherwise.  Payloads are
+compact UTF-8, without the json module's default spaces.  The json
+module still \\u-escapes non-ASCII characters: without escaping, on
+Python 2, it can't join unicode values with non-ASCII byte strings.
+
+Settings (all optional):
+
+    CONSTANT_CONTACT_FAST_JSON   If False, always use the json module
+                                 (default True).
+"""
+import json
+
+from django.conf import settings
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+def get_backend():
+    """Returns the name of the JSON module in use."""
+    if getattr(settings, 'CONSTANT_CONTACT_FAST_JSON', True):
+        if orjson is not None:
+            return 'orjson'
+        if ujson is not None:
+            return 'ujson'
+    return 'json'
+
+
+def dumps(data):
+    """Returns `data` encoded as JSON, in UTF-8 bytes."""
+    backend = get_backend()
+    if backend == 'orjson':
+        return orjson.dumps(data)
+    if backend == 'ujson':
+        body = ujson.dumps(data, ensure_ascii=False,
+                           escape_forward_slashes=False)
+    else:
+        body = json.dumps(data, separators=(',', ':'))
+    if not isinstance(body, bytes):
+        body = body.encode('utf-8')
+    return body
+
+
+def loads(content):
+    """Decodes JSON `content` (bytes or text)."""
+    backend = get_backend()
+    if backend == 'orjson':
+        return orjson.loads(content)
+    if isinstance(content, bytes):
+        content = content.decode('utf-8')
+    if backend == 'ujson':
+        return ujson.loads(content)
+    return json.loads(content)
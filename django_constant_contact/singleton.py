@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""Objects shared by every thread in a process, built from settings.
+
+The session, rate limiter, circuit breaker, render cache and the like
+are each built from settings the first time they're asked for, then
+shared, until they're reset (so settings are reread).  Each module
+makes its own with ProcessSingleton, and exposes its get() and
+reset() as get_<name>() and reset_<name>().
+
+Rendering also runs in worker processes that may not have been forked
+from a Django process, and so have no settings; setting() returns the
+default there, where getattr(settings, ...) would raise
+ImproperlyConfigured.
+"""
+import os
+import threading
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+# What a ProcessSingleton holds when build() returned None, so it
+# isn't called again.
+_NONE = object()
+
+
+def setting(name, default=None):
+    """Returns the setting `name`, or `default` if it isn't set or
+    there are no settings at all.
+    """
+    try:
+        return getattr(settings, name, default)
+    except ImproperlyConfigured:
+        return default
+
+
+class ProcessSingleton(object):
+    """Holds what build() returns, calling it the first time get() is
+    called after construction or reset().
+
+    build() may return None (the feature is off), and get() then
+    returns None.  With `per_fork`, a child process builds its own
+    rather than share its parent's (sockets and threads don't survive
+    a fork).  `close`, if given, is called with the object reset()
+    forgets.
+    """
+
+    def __init__(self, build, close=None, per_fork=False):
+        self.build = build
+        self.close = close
+        self.per_fork = per_fork
+        self.value = None
+        self.pid = None
+        self.lock = threading.Lock()
+
+    def get(self):
+        pid = os.getpid() if self.per_fork else None
+        if self.value is None or self.pid != pid:
+            with self.lock:
+                if self.value is None or self.pid != pid:
+                    value = self.build()
+                    self.value = _NONE if value is None else value
+                    self.pid = pid
+        return None if self.value is _NONE else self.value
+
+    def set(self, value):
+        """Replaces the object get() returns (for tests, say)."""
+        with self.lock:
+            self.value = _NONE if value is None else value
+            self.pid = os.getpid() if self.per_fork else None
+
+    def reset(self):
+        with self.lock:
+            value, self.value = self.value, None
+            if (self.close and value is not None and value is not _NONE and
+                    (not self.per_fork or self.pid == os.getpid())):
+                self.close(value)
+            self.pid = None
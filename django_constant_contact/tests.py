@@ -1,13 +1,40 @@
+import datetime
+import json
 import time
 import uuid
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 
 from django.conf import settings
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
 import django.test
+import requests
 
-from .models import (ConstantContact,
+from . import (circuitbreaker, fields, instrumentation, ratelimit, rendering,
+               serialization, singleton, transport, views)
+from .mockserver import MockConstantContactServer
+from .models import (CLOCK_SKEW,
+                     CampaignCreation,
+                     CampaignCreationInProgress,
+                     CampaignSchedule,
+                     ConstantContact,
                      ConstantContactAPIError,
-                     EmailMarketingCampaign)
+                     EmailMarketingCampaign,
+                     RemoteDeletion,
+                     SyncCheckpoint,
+                     TrackingEvent,
+                     TrackingSummary,
+                     parse_timestamp,
+                     payload_fingerprint)
+
+try:
+    import asyncio
+
+    from . import aio
+except (ImportError, SyntaxError):  # Python 2, or no aiohttp.
+    aio = None
 
 
 ORG_ADDRESS = {
@@ -22,6 +49,17 @@ ORG_ADDRESS = {
     'country': 'US'
 }
 
+# For tests that don't talk to Constant Contact.
+OFFLINE_CAMPAIGN_KWARGS = {
+    'name': 'Test Campaign',
+    'email_content': '<html><body>Test Email Content</body></html>',
+    'from_email': 'from@example.com',
+    'from_name': 'Test Sender',
+    'reply_to_email': 'reply@example.com',
+    'subject': 'Test Subject',
+    'text_content': '<text>Test Text Content</text>',
+    'address': ORG_ADDRESS}
+
 
 # Define assertIn here, since it doesn't live on unittest.TestCase
 # until Python 2.7.
@@ -44,7 +82,6 @@ class ConstantContactTests(unittest.TestCase):
             'subject': 'Test Subject',
             'text_content': '<text>Test Text Content</text>',
             'address': ORG_ADDRESS}
-        time.sleep(1)  # So we don't run over our queries-per-second quota.
 
     def tearDown(self):
         if self.email_marketing_campaign:
@@ -245,6 +282,827 @@ class ConstantContactTests(unittest.TestCase):
         assertIn(self, reminder_text, html)
 
 
+class TransportTests(unittest.TestCase):
+
+    def test_instances_share_session(self):
+        """Do ConstantContact instances share one pooled session?
+        """
+        first, second = ConstantContact(), ConstantContact()
+        self.assertTrue(first.api.session is second.api.session)
+        self.assertTrue(first.api.session is transport.get_session())
+
+    def test_joined_urls_keep_session(self):
+        """Do Urls made by join() use the same session?
+        """
+        cc = ConstantContact()
+        url = cc.api.join(cc.EMAIL_MARKETING_CAMPAIGN_URL)
+        self.assertTrue(isinstance(url, transport.SessionUrl))
+        self.assertTrue(url.session is cc.api.session)
+
+    def test_reset_session(self):
+        """Does reset_session() make a new session?
+        """
+        session = transport.get_session()
+        transport.reset_session()
+        self.assertFalse(session is transport.get_session())
+
+    def test_serialization(self):
+        """Do dumps() and loads() round-trip, with and without a fast
+        JSON module?
+        """
+        data = {'name': u'It\u2019s', 'email_content': '<a href="/x">'}
+        for fast_json in (True, False):
+            with override_settings(CONSTANT_CONTACT_FAST_JSON=fast_json):
+                body = serialization.dumps(data)
+                self.assertIsInstance(body, bytes)
+                self.assertEqual(data, serialization.loads(body))
+
+
+class FakeSession(object):
+    """Stands in for requests.Session; answers with canned statuses.
+    """
+
+    def __init__(self, *responses):
+        """Each of responses is a status code, or a (status code,
+        JSON-able content, or bytes to send as they are) pair.
+        """
+        self.responses = list(responses)
+        self.requests = []
+
+    def request(self, method, url, **kwargs):
+        self.requests.append((method, url, kwargs.get('params')))
+        status_code = self.responses.pop(0)
+        content = []
+        if isinstance(status_code, tuple):
+            status_code, content = status_code
+        response = requests.Response()
+        response.status_code = status_code
+        response.reason = 'Fake'
+        response._content = (content if isinstance(content, bytes)
+                             else json.dumps(content).encode('utf-8'))
+        response._content_consumed = True
+        return response
+
+
+@override_settings(CONSTANT_CONTACT_QUERIES_PER_SECOND=None,
+                   CONSTANT_CONTACT_RETRY_BACKOFF=0)
+class RateLimitTests(django.test.SimpleTestCase):
+
+    def setUp(self):
+        ratelimit.reset_rate_limiter()
+
+    def tearDown(self):
+        ratelimit.reset_rate_limiter()
+
+    def test_token_bucket(self):
+        """Does the bucket make us wait once it's empty?
+        """
+        limiter = ratelimit.LocalRateLimiter(2)
+        self.assertEqual(0, limiter.reserve())
+        self.assertEqual(0, limiter.reserve())
+        self.assertTrue(0 < limiter.reserve() <= 0.5)
+
+    def test_429_is_retried(self):
+        """Are 429s retried?
+        """
+        session = FakeSession(429, 429, 200)
+        response = ConstantContact(session=session).api.get('account/info')
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(3, len(session.requests))
+
+    def test_post_not_retried_after_500(self):
+        """Are non-idempotent requests left alone after a 5xx?
+        """
+        session = FakeSession(500, 200)
+        response = ConstantContact(session=session).api.post('x')
+        self.assertEqual(500, response.status_code)
+
+    @override_settings(CONSTANT_CONTACT_MAX_RETRIES=1)
+    def test_retries_give_up(self):
+        """Do we stop retrying after CONSTANT_CONTACT_MAX_RETRIES?
+        """
+        session = FakeSession(503, 503, 200)
+        response = ConstantContact(session=session).api.get('x')
+        self.assertEqual(503, response.status_code)
+
+
+class SlowSession(FakeSession):
+    """A FakeSession whose first request takes a second."""
+
+    def request(self, method, url, **kwargs):
+        slow = not self.requests
+        response = super(SlowSession, self).request(method, url, **kwargs)
+        if slow:
+            time.sleep(1)
+        return response
+
+
+class ProcessSingletonTests(django.test.SimpleTestCase):
+
+    def test_built_once_and_closed_on_reset(self):
+        """Is the object built once, shared, and closed and rebuilt
+        after a reset?
+        """
+        closed = []
+        process_singleton = singleton.ProcessSingleton(object,
+                                                       close=closed.append)
+        shared = process_singleton.get()
+        self.assertTrue(shared is process_singleton.get())
+        process_singleton.reset()
+        self.assertEqual([shared], closed)
+        self.assertFalse(shared is process_singleton.get())
+
+    def test_none_is_remembered(self):
+        """Is a feature that's off (build() returns None) only looked
+        up once?
+        """
+        built = []
+        process_singleton = singleton.ProcessSingleton(
+            lambda: built.append(None))
+        self.assertEqual(None, process_singleton.get())
+        self.assertEqual(None, process_singleton.get())
+        self.assertEqual(1, len(built))
+
+
+@override_settings(CONSTANT_CONTACT_QUERIES_PER_SECOND=None,
+                   CONSTANT_CONTACT_MAX_RETRIES=0,
+                   CONSTANT_CONTACT_CIRCUIT_MIN_REQUESTS=2)
+class CircuitBreakerTests(django.test.SimpleTestCase):
+
+    def setUp(self):
+        circuitbreaker.reset_circuit_breaker()
+
+    def tearDown(self):
+        circuitbreaker.reset_circuit_breaker()
+
+    def test_circuit_opens_and_closes(self):
+        """Does a circuit open after failures, then let a trial
+        request through, and close when it succeeds?
+        """
+        breaker = circuitbreaker.CircuitBreaker(min_requests=2,
+                                                reset_timeout=60)
+        breaker.record('x', failed=False)
+        breaker.record('x', failed=True)
+        self.assertEqual(circuitbreaker.OPEN, breaker.state('x'))
+        with self.assertRaises(circuitbreaker.CircuitOpenError):
+            breaker.allow('x')
+        breaker.allow('y')
+
+        breaker.circuits['x'].opened -= 60
+        breaker.allow('x')
+        self.assertEqual(circuitbreaker.HALF_OPEN, breaker.state('x'))
+        with self.assertRaises(circuitbreaker.CircuitOpenError):
+            breaker.allow('x')  # Only one trial at a time.
+        breaker.record('x', failed=False)
+        self.assertEqual(circuitbreaker.CLOSED, breaker.state('x'))
+
+    def test_interrupted_trial_is_released(self):
+        """Does a half-open circuit let another trial through once one
+        is interrupted before it has an outcome?
+        """
+        class InterruptedSession(FakeSession):
+            def request(self, method, url, **kwargs):
+                if not self.responses:
+                    raise KeyboardInterrupt()
+                return super(InterruptedSession, self).request(
+                    method, url, **kwargs)
+
+        session = InterruptedSession(500, 503)
+        cc = ConstantContact(session=session)
+        cc.api.get('account/info')
+        cc.api.get('account/info')
+        breaker = circuitbreaker.get_circuit_breaker()
+        breaker.circuits['account/info'].opened -= 60 * 60
+        with self.assertRaises(KeyboardInterrupt):
+            cc.api.get('account/info')
+        self.assertEqual(circuitbreaker.HALF_OPEN,
+                         breaker.state('account/info'))
+
+        session.responses.append(200)
+        cc.api.get('account/info')
+        self.assertEqual(circuitbreaker.CLOSED, breaker.state('account/info'))
+
+    def test_open_circuit_fails_fast(self):
+        """Once an endpoint's circuit opens, are requests to it refused
+        without calling the API?
+        """
+        session = FakeSession(500, 503, 200)
+        cc = ConstantContact(session=session)
+        cc.api.get('emailmarketing/campaigns/1/preview')
+        cc.api.get('emailmarketing/campaigns/2/preview')
+        with self.assertRaises(circuitbreaker.CircuitOpenError):
+            cc.api.get('emailmarketing/campaigns/3/preview')
+        self.assertEqual(2, len(session.requests))
+        cc.api.get('account/info')
+
+    @override_settings(CONSTANT_CONTACT_HEDGE_AFTER=0.05)
+    def test_hedged_get(self):
+        """Is a slow GET sent again, and the faster response used?
+        """
+        closed = []
+
+        class ClosingSession(SlowSession):
+            def request(self, method, url, **kwargs):
+                response = super(ClosingSession, self).request(
+                    method, url, **kwargs)
+                response.close = lambda: closed.append(response)
+                return response
+
+        session = ClosingSession((200, {'hedged': False}),
+                                 (200, {'hedged': True}))
+        response = ConstantContact(session=session).api.get('account/info')
+        self.assertEqual({'hedged': True}, response.json())
+
+        # The slow, losing response is closed once it comes.
+        deadline = time.time() + 5
+        while not closed and time.time() < deadline:
+            time.sleep(0.05)
+        self.assertEqual([{'hedged': False}],
+                         [loser.json() for loser in closed])
+
+
+class RenderCacheTests(django.test.SimpleTestCase):
+
+    def setUp(self):
+        rendering.reset_render_cache()
+
+    def tearDown(self):
+        rendering.reset_render_cache()
+
+    def test_lru_evicts_by_size(self):
+        """Does the LRU cache evict least recently used entries first?
+        """
+        cache = rendering.LRURenderCache(max_size=10)
+        cache.set('a', 'aaaa')
+        cache.set('b', 'bbbb')
+        cache.get('a')
+        cache.set('c', 'cccc')
+        self.assertEqual('aaaa', cache.get('a'))
+        self.assertEqual(None, cache.get('b'))
+        self.assertEqual('cccc', cache.get('c'))
+
+    def test_cache_key_depends_on_options(self):
+        """Is the same HTML rendered differently cached separately?
+        """
+        self.assertNotEqual(rendering.render_cache_key('<p>', minify=True),
+                            rendering.render_cache_key('<p>', minify=False))
+
+    def test_rendered_content_is_cached(self):
+        """Is rendered content cached under its key?
+        """
+        html = '<html><body>Test Email Content</body></html>'
+        rendered = rendering.render(html)
+        self.assertEqual(rendered, rendering.get_render_cache().get(
+            rendering.render_cache_key(html)))
+
+    def test_cache_key_depends_on_stylesheets(self):
+        """Once a linked stylesheet changes (and the Inliner refetches
+        it), is the content rendered again?
+        """
+        stylesheet = ['p { color: red }']
+
+        class ChangingInliner(rendering.Inliner):
+            def fetch(self, url):
+                return stylesheet[0]
+
+        html = ('<html><head><link rel="stylesheet" '
+                'href="https://example.com/brand.css"></head>'
+                '<body><p>Test</p></body></html>')
+        rendering._inliner.set(ChangingInliner(stylesheet_timeout=0))
+        try:
+            self.assertIn('color:red', rendering.render(html))
+            stylesheet[0] = 'p { color: blue }'
+            self.assertIn('color:blue', rendering.render(html))
+        finally:
+            rendering.reset_inliner()
+
+    def test_cache_hit_fetches_nothing(self):
+        """Is a cache key made without fetching stylesheets, so a hit
+        needs no network I/O?
+        """
+        fetched = []
+
+        class CountingInliner(rendering.Inliner):
+            def fetch(self, url):
+                fetched.append(url)
+                return 'p { color: red }'
+
+        html = ('<html><head><link rel="stylesheet" '
+                'href="https://example.com/brand.css"></head>'
+                '<body><p>Test</p></body></html>')
+        rendering._inliner.set(CountingInliner())
+        try:
+            self.assertEqual(None, rendering.render_cache_key(html))
+            rendered = rendering.render(html)
+            self.assertEqual(rendered, rendering.get_render_cache().get(
+                rendering.render_cache_key(html)))
+            self.assertEqual(rendered, rendering.render(html))
+            self.assertEqual(1, len(fetched))
+        finally:
+            rendering.reset_inliner()
+
+    @override_settings(CONSTANT_CONTACT_RENDER_CACHE_SIZE=0)
+    def test_cache_can_be_turned_off(self):
+        """Does CONSTANT_CONTACT_RENDER_CACHE_SIZE = 0 turn caching off?
+        """
+        self.assertEqual(None, rendering.get_render_cache())
+
+
+class RenderingTests(django.test.SimpleTestCase):
+
+    def tearDown(self):
+        rendering.reset_render_executor()
+
+    def test_steps_can_be_skipped(self):
+        """Does render_email_content() skip the steps it's told to?
+        """
+        html = '<p>Test</p>'
+        self.assertEqual(html, rendering.render_email_content(
+            html, inline=False, minify=False, sanitize=False))
+
+    def test_sanitizer(self):
+        """Are unsupported characters replaced, in text and in bytes?
+        """
+        sanitizer = rendering.Sanitizer()
+        text = u'It\u2019s \u201cgreen\u201d\u2014mostly\u2026'
+        expected = u'It\'s "green"&#8212;mostly...'
+        self.assertEqual(
+            (expected, {u'\u2019': 1, u'\u201c': 1, u'\u201d': 1,
+                        u'\u2014': 1, u'\u2026': 1}),
+            sanitizer.sanitize(text))
+        self.assertEqual(expected.encode('utf-8'),
+                         sanitizer.sanitize(text.encode('utf-8'))[0])
+
+    @override_settings(
+        CONSTANT_CONTACT_SANITIZE_REPLACEMENTS={u'\u2122': u'(TM)'})
+    def test_sanitizer_replacements_setting(self):
+        """Does CONSTANT_CONTACT_SANITIZE_REPLACEMENTS replace the table?
+        """
+        rendering.reset_sanitizer()
+        try:
+            self.assertEqual(u'Brand(TM) \u2019',
+                             rendering.work_around(u'Brand\u2122 \u2019'))
+        finally:
+            rendering.reset_sanitizer()
+
+    def test_inliner_parses_stylesheets_once(self):
+        """Does an Inliner fetch and parse a shared stylesheet once?
+        """
+        fetched = []
+
+        class CountingInliner(rendering.Inliner):
+            def fetch(self, url):
+                fetched.append(url)
+                return 'p { color: red }'
+
+        inliner = CountingInliner(
+            external_styles='https://example.com/brand.css')
+        for i in range(3):
+            html = inliner.inline(
+                '<html><body><p>Email {0}</p></body></html>'.format(i))
+            self.assertIn('style="color:red"', html)
+        self.assertEqual(['https://example.com/brand.css'], fetched)
+        self.assertEqual(1, len(inliner.rules))
+
+        inliner.stylesheet_timeout = 0
+        inliner.inline('<html><body><p>Email</p></body></html>')
+        self.assertEqual(2, len(fetched))
+
+    def test_campaign_template(self):
+        """Does a CampaignTemplate render once, and fill in its slots?
+        """
+        template = rendering.CampaignTemplate(
+            '<html><head><style>p { color: red }</style></head><body>'
+            '<p>{{ chapter }}</p><a href="{{ url }}">{{chapter}}</a>'
+            '</body></html>')
+        self.assertEqual(['chapter', 'url'], template.slots)
+        content = template.fill(chapter=u'Ohio \u2013 <North>',
+                                url='https://example.com/?a=1&b=2')
+        self.assertIsInstance(content, rendering.PreparedContent)
+        self.assertIn(u'<p style="color:red">Ohio &#8211; &lt;North&gt;</p>',
+                      content)
+        self.assertIn('href="https://example.com/?a=1&amp;b=2"', content)
+        self.assertIs(content, rendering.render(content))
+        with self.assertRaises(ValueError):
+            template.fill(chapter='Ohio')
+
+    @override_settings(CONSTANT_CONTACT_RENDER_PROCESSES=2,
+                       CONSTANT_CONTACT_RENDER_CACHE_SIZE=0)
+    def test_process_pool(self):
+        """Does rendering in a process pool match rendering in process?
+        """
+        rendering.reset_render_cache()
+        htmls = ['<html><body>Email {0}</body></html>'.format(i)
+                 for i in range(4)]
+        self.assertEqual(
+            [rendering.render_email_content(html) for html in htmls],
+            rendering.render_many(htmls))
+        rendering.reset_render_cache()
+
+
+@override_settings(CONSTANT_CONTACT_QUERIES_PER_SECOND=None)
+class InstrumentationTests(django.test.SimpleTestCase):
+
+    def setUp(self):
+        self.timings = []
+        instrumentation.phase_timed.connect(self.record)
+
+    def tearDown(self):
+        instrumentation.phase_timed.disconnect(self.record)
+
+    def record(self, phase, duration, tags, **kwargs):
+        self.timings.append((phase, tags))
+
+    def test_http_is_timed(self):
+        """Are requests timed, and tagged with endpoint and status?
+        """
+        session = FakeSession((200, {'id': '1'}))
+        ConstantContact(session=session).api.get(
+            'emailmarketing/campaigns/1100394165290')
+        phase, tags = self.timings[0]
+        self.assertEqual('http', phase)
+        self.assertEqual('emailmarketing/campaigns/{id}', tags['endpoint'])
+        self.assertEqual(200, tags['status_code'])
+        self.assertEqual(len('{"id": "1"}'), tags['response_bytes'])
+
+    def test_metrics_callback(self):
+        """Is CONSTANT_CONTACT_METRICS_CALLBACK called for each phase?
+        """
+        phases = []
+        with override_settings(
+                CONSTANT_CONTACT_METRICS_CALLBACK=lambda phase, duration,
+                **tags: phases.append(phase)):
+            rendering.render_email_content('<p>Test</p>', inline=False)
+        self.assertEqual(['minify', 'sanitize'], phases)
+
+
+class InterleavedSession(object):
+    """A requests session that calls `before_post` before each POST,
+    to stand in for a concurrent caller.
+    """
+
+    def __init__(self, before_post):
+        self.session = requests.Session()
+        self.before_post = before_post
+
+    def request(self, method, url, **kwargs):
+        if method.upper() == 'POST':
+            self.before_post()
+        return self.session.request(method, url, **kwargs)
+
+
+@override_settings(CONSTANT_CONTACT_QUERIES_PER_SECOND=None,
+                   CONSTANT_CONTACT_MAX_RETRIES=0)
+class MockServerTests(django.test.TestCase):
+
+    def setUp(self):
+        self.server = MockConstantContactServer().start()
+        self.settings_override = override_settings(
+            CONSTANT_CONTACT_API_URL=self.server.url)
+        self.settings_override.enable()
+        self.cc = ConstantContact()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.server.stop()
+
+    def test_round_trip(self):
+        """Can we create, preview and delete against the mock server?
+        """
+        emc = self.cc.new_email_marketing_campaign(**OFFLINE_CAMPAIGN_KWARGS)
+        html, text = self.cc.preview_email_marketing_campaign(emc)
+        self.assertEqual(OFFLINE_CAMPAIGN_KWARGS['text_content'], text)
+        emc.delete()
+        self.assertEqual({}, self.server.campaigns)
+
+    def test_idempotent_create(self):
+        """Does a create under a key that's been used before return (or
+        adopt) the campaign, rather than make another?
+        """
+        emc = self.cc.new_email_marketing_campaign(
+            idempotency_key='first', **OFFLINE_CAMPAIGN_KWARGS)
+        self.assertEqual(emc, self.cc.new_email_marketing_campaign(
+            idempotency_key='first', **OFFLINE_CAMPAIGN_KWARGS))
+
+        # The POST got through, but nothing was saved here.
+        CampaignCreation.objects.create(key='second', name='Interrupted')
+        lost = self.server.create(dict(OFFLINE_CAMPAIGN_KWARGS,
+                                       name='Interrupted'))
+        emc = self.cc.new_email_marketing_campaign(
+            idempotency_key='second',
+            **dict(OFFLINE_CAMPAIGN_KWARGS, name='Interrupted'))
+        self.assertEqual(lost['id'], str(emc.constant_contact_id))
+        self.assertEqual(2, len(self.server.campaigns))
+
+    def test_concurrent_idempotent_creates(self):
+        """While a create under a key is in progress, does another
+        with the same key refuse, rather than POST a second campaign?
+        """
+        refused = []
+
+        def create_again():
+            try:
+                self.cc.new_email_marketing_campaign(
+                    idempotency_key='same', **OFFLINE_CAMPAIGN_KWARGS)
+            except CampaignCreationInProgress as exc:
+                refused.append(exc.key)
+
+        emc = ConstantContact(
+            session=InterleavedSession(create_again)
+        ).new_email_marketing_campaign(idempotency_key='same',
+                                       **OFFLINE_CAMPAIGN_KWARGS)
+        self.assertEqual(['same'], refused)
+        self.assertEqual(emc, self.cc.new_email_marketing_campaign(
+            idempotency_key='same', **OFFLINE_CAMPAIGN_KWARGS))
+        self.assertEqual(1, len(self.server.campaigns))
+
+    def test_reconcile_campaigns(self):
+        """Are stale pending creates adopted or failed, and possible
+        duplicates reported, but only deleted when asked?
+        """
+        saved = self.cc.new_email_marketing_campaign(
+            **dict(OFFLINE_CAMPAIGN_KWARGS, name='Orphan'))
+        orphan = self.server.create({'name': 'Orphan'})
+        duplicate = self.server.create({'name': 'Orphan'})
+        recorded = self.server.create({'name': 'Recorded'})
+        self.server.create({'name': 'Recorded'})
+        CampaignCreation.objects.create(key='a', name='Orphan')
+        CampaignCreation.objects.create(key='b', name='Never sent')
+        CampaignCreation.objects.create(
+            key='c', name='Recorded', constant_contact_id=recorded['id'])
+        CampaignCreation.objects.update(
+            created=timezone.now() - datetime.timedelta(hours=1))
+
+        self.assertEqual((2, 1, {int(duplicate['id']): 'a'}),
+                         self.cc.reconcile_campaigns())
+        self.assertEqual(5, len(self.server.campaigns))
+        self.assertEqual(
+            [int(orphan['id']), int(recorded['id'])],
+            list(CampaignCreation.objects.filter(
+                status=CampaignCreation.CREATED).order_by('key').values_list(
+                    'constant_contact_id', flat=True)))
+        self.assertTrue(EmailMarketingCampaign.objects.filter(
+            constant_contact_id=orphan['id']).exists())
+        self.assertEqual(
+            CampaignCreation.FAILED,
+            CampaignCreation.objects.get(key='b').status)
+
+        self.assertEqual(1, self.cc.delete_duplicate_campaigns(
+            [duplicate['id'], orphan['id'], saved.constant_contact_id]))
+        self.assertNotIn(duplicate['id'], self.server.campaigns)
+        self.assertEqual(4, len(self.server.campaigns))
+
+    @override_settings(CONSTANT_CONTACT_FAST_JSON=False)
+    def test_non_ascii_subject(self):
+        """Can a campaign be made with a non-ASCII subject, given as a
+        UTF-8 str on Python 2, by the json module?
+        """
+        subject = u'Caf\xe9 news'
+        emc = self.cc.new_email_marketing_campaign(**dict(
+            OFFLINE_CAMPAIGN_KWARGS,
+            subject=subject.encode('utf-8') if str is bytes else subject))
+        self.assertEqual(subject, emc.data['subject'])
+        self.assertEqual(subject, self.server.campaigns[
+            str(emc.constant_contact_id)]['subject'])
+
+    @override_settings(CONSTANT_CONTACT_GZIP_REQUESTS=True)
+    def test_gzip_and_include_content(self):
+        """Are big bodies sent gzipped, and can the content Constant
+        Contact echoes back be left out of `data`?
+        """
+        kwargs = dict(OFFLINE_CAMPAIGN_KWARGS,
+                      email_content='<html><body>{0}</body></html>'.format(
+                          '<p>Paragraph</p>' * 100))
+        emc = self.cc.new_email_marketing_campaign(include_content=False,
+                                                   **kwargs)
+        self.assertEqual(1, self.server.gzipped_request_count)
+        self.assertNotIn('email_content', emc.data)
+        self.assertIn('<p>Paragraph</p>', self.server.campaigns[
+            str(emc.constant_contact_id)]['email_content'])
+
+    def test_process_schedules(self):
+        """Are queued schedules made, and late ones failed?
+        """
+        emcs = [self.cc.new_email_marketing_campaign(
+            **dict(OFFLINE_CAMPAIGN_KWARGS, name='Chapter {0}'.format(i)))
+            for i in range(3)]
+        now = timezone.now()
+        self.cc.queue_schedules(emcs[:2], now + datetime.timedelta(days=1))
+        self.cc.queue_schedules(emcs[2:], now - datetime.timedelta(days=1))
+
+        self.assertEqual((2, 1), self.cc.process_schedules())
+        for emc in emcs[:2]:
+            self.assertEqual(1, len(self.cc.get_schedules(emc)))
+        self.assertEqual([], self.cc.get_schedules(emcs[2]))
+        self.assertEqual(['FAILED', 'SCHEDULED', 'SCHEDULED'], sorted(
+            CampaignSchedule.objects.values_list('status', flat=True)))
+
+    @override_settings(CONSTANT_CONTACT_MAX_RETRIES=0)
+    def test_throttled_schedules_are_retried(self):
+        """Are throttled schedules left pending, until after Retry-After,
+        rather than failed?
+        """
+        emc = self.cc.new_email_marketing_campaign(**OFFLINE_CAMPAIGN_KWARGS)
+        self.cc.queue_schedules(
+            [emc], timezone.now() + datetime.timedelta(days=1))
+        self.server.throttle_rate = 1
+        self.server.retry_after = 600
+
+        self.assertEqual((0, 0), self.cc.process_schedules(max_attempts=1))
+        campaign_schedule = CampaignSchedule.objects.get()
+        self.assertEqual((CampaignSchedule.PENDING, 0),
+                         (campaign_schedule.status,
+                          campaign_schedule.attempts))
+        self.assertTrue(campaign_schedule.next_attempt >=
+                        timezone.now() + datetime.timedelta(minutes=9))
+        self.assertEqual((0, 0), self.cc.process_schedules(max_attempts=1))
+
+        self.server.throttle_rate = 0
+        CampaignSchedule.objects.update(next_attempt=timezone.now())
+        self.assertEqual((1, 0), self.cc.process_schedules(max_attempts=1))
+        self.assertEqual(1, len(self.cc.get_schedules(emc)))
+
+    def test_contacts(self):
+        """Are contacts imported in bulk, and paged through?
+        """
+        contact_list = self.cc.new_list('Chapter Members')
+        contacts = ({'email_addresses': 'member{0}@example.com'.format(i),
+                     'first_name': 'Member {0}'.format(i)}
+                    for i in range(5))
+        activities = self.cc.add_contacts(contacts, [contact_list['id']],
+                                          batch_size=2)
+        self.assertEqual([2, 2, 1],
+                         [a['contact_count'] for a in activities])
+        self.assertEqual(
+            'COMPLETE', self.cc.get_activity(activities[0]['id'])['status'])
+        self.assertEqual(
+            ['member{0}@example.com'.format(i) for i in range(5)],
+            [contact['email_addresses'][0]['email_address']
+             for contact in self.cc.iter_contacts(limit=2)])
+        self.assertEqual(['Chapter Members'],
+                         [result['name'] for result in self.cc.iter_lists()])
+
+    def test_sync_tracking(self):
+        """Are tracking events stored, summarized, and resumed from?
+        """
+        emc = self.cc.new_email_marketing_campaign(**OFFLINE_CAMPAIGN_KWARGS)
+        campaign_id = emc.constant_contact_id
+        for contact_id in ('1', '1', '2'):
+            self.server.track(campaign_id, 'opens', contact_id=contact_id,
+                              email_address='{0}@example.com'.format(
+                                  contact_id))
+        self.server.track(campaign_id, 'clicks', contact_id='2',
+                          link_id='1')
+        self.assertEqual(4, self.cc.sync_tracking(emc))
+        summary = TrackingSummary.objects.get(email_marketing_campaign=emc)
+        self.assertEqual((3, 2, 1), (summary.opens, summary.unique_opens,
+                                     summary.clicks))
+
+        self.server.track(campaign_id, 'opens', contact_id='3',
+                          open_date='2099-01-01T00:00:00.000Z')
+        self.assertEqual(1, self.cc.sync_tracking(emc))
+        self.assertEqual(0, self.cc.sync_tracking(emc))
+        self.assertEqual(4, TrackingSummary.objects.get(
+            email_marketing_campaign=emc).opens)
+
+    def test_interrupted_sync_tracking(self):
+        """Does a sync interrupted before its first checkpoint store each
+        event once when it's run again?
+        """
+        emc = self.cc.new_email_marketing_campaign(**OFFLINE_CAMPAIGN_KWARGS)
+        for day in range(1, 4):
+            self.server.track(emc.constant_contact_id, 'opens',
+                              contact_id=str(day),
+                              open_date='2017-01-0{0}T00:00:00.000Z'.format(
+                                  day))
+        iter_tracking = self.cc.iter_tracking
+
+        def interrupted(*args, **kwargs):
+            for i, data in enumerate(iter_tracking(*args, **kwargs)):
+                if i == 2:
+                    raise requests.ConnectionError()
+                yield data
+
+        self.cc.iter_tracking = interrupted
+        with self.assertRaises(requests.ConnectionError):
+            self.cc.sync_tracking(emc, activities=['opens'], batch_size=2)
+        self.assertEqual(2, TrackingEvent.objects.count())
+        self.assertFalse(SyncCheckpoint.objects.exclude(value='').exists())
+
+        del self.cc.iter_tracking
+        self.assertEqual(1, self.cc.sync_tracking(emc, activities=['opens']))
+        self.assertEqual([1, 2, 3], sorted(
+            TrackingEvent.objects.values_list('contact_id', flat=True)))
+
+    def test_injected_429(self):
+        """Does the mock server throttle when told to?
+        """
+        self.server.throttle_rate = 1
+        try:
+            self.cc.new_email_marketing_campaign(**OFFLINE_CAMPAIGN_KWARGS)
+        except ConstantContactAPIError as exc:
+            self.assertEqual(429, exc.status_code)
+        else:
+            self.fail('ConstantContactAPIError not raised')
+
+
+@unittest.skipIf(aio is None, 'AsyncConstantContact needs Python 3.5+ '
+                 'and aiohttp.')
+@override_settings(CONSTANT_CONTACT_QUERIES_PER_SECOND=None,
+                   CONSTANT_CONTACT_RETRY_BACKOFF=0)
+class AsyncConstantContactTests(django.test.TransactionTestCase):
+    """AsyncConstantContact against the mock server.  Its ORM calls run
+    on executor threads, hence TransactionTestCase.
+    """
+
+    def setUp(self):
+        self.server = MockConstantContactServer().start()
+        self.settings_override = override_settings(
+            CONSTANT_CONTACT_API_URL=self.server.url)
+        self.settings_override.enable()
+        self.loop = asyncio.new_event_loop()
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.cc = aio.AsyncConstantContact(executor=self.executor)
+
+    def tearDown(self):
+        self.wait(self.cc.close())
+        self.loop.close()
+        self.executor.shutdown()
+        self.settings_override.disable()
+        self.server.stop()
+
+    def wait(self, coroutine):
+        return self.loop.run_until_complete(coroutine)
+
+    @override_settings(CONSTANT_CONTACT_API_KEY=None,
+                       CONSTANT_CONTACT_ACCESS_TOKEN=None)
+    def test_unset_credentials_are_left_out(self):
+        """Are unset credentials left out of the query, as requests
+        does, rather than breaking every call?
+        """
+        cc = aio.AsyncConstantContact(executor=self.executor)
+        try:
+            self.assertEqual({}, cc.params)
+            emc = self.wait(cc.new_email_marketing_campaign(
+                **OFFLINE_CAMPAIGN_KWARGS))
+            self.assertTrue(emc.pk)
+        finally:
+            self.wait(cc.close())
+
+    def test_create_and_update(self):
+        """Is a campaign created, an unchanged update skipped, and a
+        changed one sent?
+        """
+        emc = self.wait(self.cc.new_email_marketing_campaign(
+            **OFFLINE_CAMPAIGN_KWARGS))
+        self.assertTrue(EmailMarketingCampaign.objects.filter(
+            pk=emc.pk, constant_contact_id=emc.constant_contact_id).exists())
+        self.assertEqual([str(emc.constant_contact_id)],
+                         list(self.server.campaigns))
+
+        request_count = self.server.request_count
+        self.assertTrue(emc is self.wait(
+            self.cc.update_email_marketing_campaign(
+                emc, **OFFLINE_CAMPAIGN_KWARGS)))
+        self.assertEqual(request_count, self.server.request_count)
+
+        self.wait(self.cc.update_email_marketing_campaign(
+            emc, **dict(OFFLINE_CAMPAIGN_KWARGS, subject='Changed')))
+        self.assertEqual(request_count + 1, self.server.request_count)
+        self.assertEqual('Changed', EmailMarketingCampaign.objects.get(
+            pk=emc.pk).data['subject'])
+
+    def test_preview_is_cached(self):
+        """Is a second preview served from the cache?
+        """
+        emc = self.wait(self.cc.new_email_marketing_campaign(
+            **OFFLINE_CAMPAIGN_KWARGS))
+        request_count = self.server.request_count
+        html, text = self.wait(self.cc.preview_email_marketing_campaign(emc))
+        self.assertEqual(OFFLINE_CAMPAIGN_KWARGS['text_content'], text)
+        self.assertEqual((html, text), self.wait(
+            self.cc.preview_email_marketing_campaign(emc)))
+        self.assertEqual(request_count + 1, self.server.request_count)
+
+    def test_429_is_retried(self):
+        """Are 429s retried?
+        """
+        self.server.throttle_next = 2
+        self.wait(self.cc.new_email_marketing_campaign(
+            **OFFLINE_CAMPAIGN_KWARGS))
+        self.assertEqual(3, self.server.request_count)
+        self.assertEqual(1, len(self.server.campaigns))
+
+    def test_4xx_raises(self):
+        """Does a 4xx raise ConstantContactAPIError, without a retry?
+        """
+        emc = EmailMarketingCampaign(constant_contact_id=1)
+        with self.assertRaises(ConstantContactAPIError) as raised:
+            self.wait(self.cc.delete_email_marketing_campaign(emc))
+        self.assertEqual(404, raised.exception.status_code)
+        self.assertEqual(1, self.server.request_count)
+
+
 class EmailMarketingCampaignTests(django.test.TestCase):
 
     def test_pre_save_works(self):
@@ -266,3 +1124,261 @@ class EmailMarketingCampaignTests(django.test.TestCase):
         emc.save()
 
         self.assertRaises(ConstantContactAPIError, emc.delete)
+
+    def test_bulk_update_data(self):
+        """Does bulk_update_data() save everyone's data?
+        """
+        emcs = [EmailMarketingCampaign.objects.create(data={'id': i})
+                for i in (1, 2)]
+        for emc in emcs:
+            emc.data['name'] = 'Campaign {0}'.format(emc.pk)
+        EmailMarketingCampaign.bulk_update_data(emcs)
+        for emc in emcs:
+            self.assertEqual(
+                'Campaign {0}'.format(emc.pk),
+                EmailMarketingCampaign.objects.get(pk=emc.pk).data['name'])
+            self.assertEqual(
+                'Campaign {0}'.format(emc.pk),
+                EmailMarketingCampaign.objects.get(pk=emc.pk).name)
+
+    def test_data_fields_are_queryable(self):
+        """Are status and modified_date copied out of data?
+        """
+        for i, status in enumerate(('DRAFT', 'SENT')):
+            EmailMarketingCampaign.objects.create(data={
+                'id': i, 'status': status,
+                'modified_date': '2016-09-0{0}T18:28:42.000Z'.format(i + 1)})
+        drafts = EmailMarketingCampaign.objects.filter(
+            status='DRAFT',
+            modified_date__lt=parse_timestamp(
+                '2016-09-02T00:00:00.000Z'))
+        self.assertEqual(['0'], [str(emc.constant_contact_id)
+                                 for emc in drafts])
+
+    @override_settings(CONSTANT_CONTACT_SPLIT_CONTENT=True)
+    def test_split_content(self):
+        """Is content kept out of data, and loaded when asked for?
+        """
+        emc = EmailMarketingCampaign.objects.create(data={
+            'id': 1, 'name': 'Split', 'email_content': '<html></html>'})
+        emc = EmailMarketingCampaign.objects.get(pk=emc.pk)
+        self.assertEqual({'id': 1, 'name': 'Split'}, emc.data)
+        self.assertEqual('<html></html>', emc.full_data['email_content'])
+
+        emc.data['email_content'] = '<html>New</html>'
+        EmailMarketingCampaign.bulk_update_data([emc])
+        emc = EmailMarketingCampaign.objects.get(pk=emc.pk)
+        self.assertEqual({'email_content': '<html>New</html>'},
+                         emc.content_data)
+
+    def test_compressed_data(self):
+        """Is data stored compressed, and read back either way?
+        """
+        data = {'id': 1, 'email_content': '<p>Compress me</p>' * 100}
+        with override_settings(CONSTANT_CONTACT_COMPRESS_DATA=True):
+            emc = EmailMarketingCampaign.objects.create(data=data)
+        self.assertTrue(self.stored_data(emc).startswith(fields.PREFIX))
+        self.assertEqual(
+            data, EmailMarketingCampaign.objects.get(pk=emc.pk).data)
+
+        fields.rewrite(EmailMarketingCampaign.objects.all())
+        self.assertEqual(data, json.loads(self.stored_data(emc)))
+
+    def stored_data(self, emc):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT data FROM {0} WHERE id = %s'.format(
+                EmailMarketingCampaign._meta.db_table), [emc.pk])
+            return cursor.fetchone()[0]
+
+    @override_settings(CONSTANT_CONTACT_QUERIES_PER_SECOND=None)
+    def test_bulk_create_campaigns(self):
+        """Does bulk_create_campaigns() save successes and return errors?
+        """
+        session = FakeSession((201, {'id': '5'}),
+                              (400, [{'error_message': 'Bad'}]))
+        cc = ConstantContact(session=session)
+        created, failed = cc.bulk_create_campaigns(
+            [OFFLINE_CAMPAIGN_KWARGS, OFFLINE_CAMPAIGN_KWARGS], max_workers=1)
+        self.assertEqual(5, created.constant_contact_id)
+        self.assertTrue(created.pk)
+        self.assertTrue(isinstance(failed, ConstantContactAPIError))
+
+    @override_settings(CONSTANT_CONTACT_QUERIES_PER_SECOND=None)
+    def test_bulk_create_campaigns_with_bad_items(self):
+        """Are bad items left unsent, and the successes saved, whatever
+        the others raise?
+        """
+        session = FakeSession((201, {'id': '5'}), (201, b'Not JSON'))
+        cc = ConstantContact(session=session)
+        created, malformed, unparsed = cc.bulk_create_campaigns(
+            [OFFLINE_CAMPAIGN_KWARGS,
+             dict(OFFLINE_CAMPAIGN_KWARGS, address={}),
+             OFFLINE_CAMPAIGN_KWARGS], max_workers=1)
+        self.assertEqual(2, len(session.requests))
+        self.assertEqual(
+            [created.pk],
+            list(EmailMarketingCampaign.objects.values_list('pk', flat=True)))
+        self.assertTrue(isinstance(malformed, KeyError))
+        self.assertTrue(isinstance(unparsed, ValueError))
+
+    @override_settings(CONSTANT_CONTACT_QUERIES_PER_SECOND=None)
+    def test_bulk_update_campaigns(self):
+        """Does bulk_update_campaigns() save the updates, skip unchanged
+        campaigns and bad items, and return errors?
+        """
+        session = FakeSession((200, {'id': '6', 'subject': 'Updated'}),
+                              (400, [{'error_message': 'Bad'}]))
+        cc = ConstantContact(session=session)
+        data = cc.email_marketing_campaign_data(**OFFLINE_CAMPAIGN_KWARGS)
+        unchanged, changed, rejected, malformed = [
+            EmailMarketingCampaign.objects.create(
+                data={'id': constant_contact_id},
+                payload_fingerprint=payload_fingerprint(data))
+            for constant_contact_id in ('5', '6', '7', '8')]
+        changed_kwargs = dict(OFFLINE_CAMPAIGN_KWARGS, subject='Updated')
+        results = cc.bulk_update_campaigns(
+            [dict(OFFLINE_CAMPAIGN_KWARGS,
+                  email_marketing_campaign=unchanged),
+             dict(changed_kwargs, email_marketing_campaign=changed),
+             dict(changed_kwargs, email_marketing_campaign=rejected),
+             dict(changed_kwargs, address={},
+                  email_marketing_campaign=malformed)], max_workers=1)
+
+        self.assertEqual(2, len(session.requests))
+        self.assertEqual([unchanged, changed], results[:2])
+        self.assertTrue(isinstance(results[2], ConstantContactAPIError))
+        self.assertTrue(isinstance(results[3], KeyError))
+        self.assertEqual('Updated', EmailMarketingCampaign.objects.get(
+            pk=changed.pk).data['subject'])
+        self.assertEqual({'id': '7'}, EmailMarketingCampaign.objects.get(
+            pk=rejected.pk).data)
+
+    @override_settings(CONSTANT_CONTACT_QUERIES_PER_SECOND=None)
+    def test_unchanged_update_is_skipped(self):
+        """Is an update that wouldn't change anything skipped?
+        """
+        session = FakeSession((200, {'id': '5', 'subject': 'Forced'}))
+        cc = ConstantContact(session=session)
+        data = cc.email_marketing_campaign_data(**OFFLINE_CAMPAIGN_KWARGS)
+        emc = EmailMarketingCampaign.objects.create(
+            data={'id': '5'}, payload_fingerprint=payload_fingerprint(data))
+
+        cc.update_email_marketing_campaign(emc, **OFFLINE_CAMPAIGN_KWARGS)
+        self.assertEqual([], session.requests)
+
+        cc.update_email_marketing_campaign(emc, force=True,
+                                           **OFFLINE_CAMPAIGN_KWARGS)
+        self.assertEqual(1, len(session.requests))
+        self.assertEqual(
+            'Forced', EmailMarketingCampaign.objects.get(pk=emc.pk).data[
+                'subject'])
+
+    @override_settings(CONSTANT_CONTACT_QUERIES_PER_SECOND=None)
+    def test_sync_campaigns(self):
+        """Does sync_campaigns() page through campaigns and upsert them?
+        """
+        emc = EmailMarketingCampaign.objects.create(
+            data={'id': '5', 'status': 'DRAFT', 'subject': 'Kept'})
+        session = FakeSession(
+            (200, {'meta': {'pagination': {
+                'next_link': '/v2/emailmarketing/campaigns?next=abc'}},
+                'results': [{'id': '5', 'status': 'SENT'}]}),
+            (200, {'meta': {'pagination': {}},
+                   'results': [{'id': '6', 'status': 'DRAFT'}]}),
+            (200, {'results': []}))
+        cc = ConstantContact(session=session)
+
+        self.assertEqual(2, cc.sync_campaigns(batch_size=1))
+
+        emc = EmailMarketingCampaign.objects.get(pk=emc.pk)
+        self.assertEqual('SENT', emc.data['status'])
+        self.assertEqual('Kept', emc.data['subject'])
+        self.assertEqual('DRAFT', EmailMarketingCampaign.objects.get(
+            constant_contact_id=6).data['status'])
+        self.assertTrue(session.requests[1][1].endswith('?next=abc'))
+        self.assertTrue('api_key' in session.requests[1][2])
+
+        # The next sync only asks for what's changed since.
+        last_synced = SyncCheckpoint.objects.get(
+            key='emailmarketing/campaigns').value
+        self.assertTrue(
+            parse_timestamp(last_synced) <= timezone.now() - CLOCK_SKEW)
+        cc.sync_campaigns()
+        self.assertEqual(last_synced,
+                         session.requests[2][2]['modified_since'])
+
+    @override_settings(CONSTANT_CONTACT_QUERIES_PER_SECOND=None)
+    def test_preview_is_cached_until_modified(self):
+        """Are previews cached until the campaign is modified?
+        """
+        preview = {'preview_email_content': '<p>Preview</p>',
+                   'preview_text_content': 'Preview'}
+        session = FakeSession((200, preview), (200, preview))
+        cc = ConstantContact(session=session)
+        emc = EmailMarketingCampaign.objects.create(
+            data={'id': '7', 'modified_date': '2016-01-01T00:00:00.000Z'})
+        cc.invalidate_preview(emc)
+
+        self.assertEqual(('<p>Preview</p>', 'Preview'),
+                         cc.preview_email_marketing_campaign(emc))
+        cc.preview_email_marketing_campaign(emc)
+        self.assertEqual(1, len(session.requests))
+
+        emc.data['modified_date'] = '2016-01-02T00:00:00.000Z'
+        cc.preview_email_marketing_campaign(emc)
+        self.assertEqual(2, len(session.requests))
+
+    @override_settings(CONSTANT_CONTACT_DEFER_DELETES=True,
+                       CONSTANT_CONTACT_QUERIES_PER_SECOND=None,
+                       CONSTANT_CONTACT_MAX_RETRIES=0)
+    def test_deferred_deletes(self):
+        """Are deferred deletes queued, then processed?
+        """
+        for i in (1, 2, 3):
+            EmailMarketingCampaign.objects.create(data={'id': i})
+        EmailMarketingCampaign.objects.all().delete()
+        self.assertEqual(3, RemoteDeletion.objects.count())
+
+        session = FakeSession(204, 404, 500)
+        cc = ConstantContact(session=session)
+        self.assertEqual((2, 1), cc.process_remote_deletions(max_workers=1))
+
+        remote_deletion = RemoteDeletion.objects.get()
+        self.assertEqual(3, remote_deletion.constant_contact_id)
+        self.assertEqual(1, remote_deletion.attempts)
+
+    @override_settings(CONSTANT_CONTACT_WEBHOOK_SECRET='s3cret')
+    def test_webhook(self):
+        """Do signed notifications update campaigns, and others not?
+        """
+        emc = EmailMarketingCampaign.objects.create(data={
+            'id': '7', 'status': 'DRAFT',
+            'modified_date': '2016-01-02T00:00:00.000Z'})
+        factory = django.test.RequestFactory()
+
+        def post(notifications, secret='s3cret'):
+            body = json.dumps(notifications).encode('utf-8')
+            return views.webhook(factory.post(
+                '/webhook/', body, content_type='application/json',
+                HTTP_X_CTCT_HMAC_SHA256=views.signature(body, secret)))
+
+        response = post({'campaign_id': '7', 'status': 'SENT'}, 'wrong')
+        self.assertEqual(403, response.status_code)
+
+        # Older than what's saved, so ignored.
+        response = post([{'campaign_id': '7', 'status': 'SCHEDULED',
+                          'modified_date': '2016-01-01T00:00:00.000Z'},
+                         {'campaign_id': '8', 'status': 'SENT'}])
+        self.assertEqual({'updated': 0},
+                         json.loads(response.content.decode('utf-8')))
+
+        response = post({'url': 'https://api.constantcontact.com/v2/'
+                                'emailmarketing/campaigns/7',
+                         'status': 'SENT',
+                         'modified_date': '2016-01-03T00:00:00.000Z'})
+        self.assertEqual({'updated': 1},
+                         json.loads(response.content.decode('utf-8')))
+        emc = EmailMarketingCampaign.objects.get(pk=emc.pk)
+        self.assertEqual('SENT', emc.status)
+        self.assertEqual('2016-01-03T00:00:00.000Z',
+                         emc.data['modified_date'])
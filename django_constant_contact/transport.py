@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+"""HTTP plumbing shared by every ConstantContact client.
+
+Each request to Constant Contact used to go through a bare
+`requests.request()` call (that's what nap does), which means a new
+TCP connection and TLS handshake per API call.  Here we keep one
+connection-pooled `requests.Session` per process and hand it to a
+nap `Url` subclass, so every ConstantContact instance -- including
+the ones created inside signal handlers -- reuses warm connections.
+
+Settings (all optional):
+
+    CONSTANT_CONTACT_POOL_SIZE   Max connections kept open to the API
+                                 host (default 10).
+    CONSTANT_CONTACT_POOL_BLOCK  If True, threads wait for a free
+                                 connection instead of opening an
+                                 extra, unpooled one (default False).
+    CONSTANT_CONTACT_KEEP_ALIVE  If False, connections are closed after
+                                 each request (default True).
+    CONSTANT_CONTACT_TIMEOUT     Seconds, or a (connect, read) tuple,
+                                 passed to requests (default (5, 60)).
+    CONSTANT_CONTACT_GZIP_REQUESTS
+                                 If True, request bodies of 1 KB or
+                                 more are sent gzipped (default
+                                 False; Constant Contact doesn't
+                                 document support for it).
+    CONSTANT_CONTACT_HEDGE_AFTER
+                                 Seconds to wait for a response to a
+                                 GET before sending it again, and
+                                 taking whichever response comes
+                                 first (default None: don't).
+
+Responses are requested gzipped (requests asks for them by default).
+Requests also go through the rate limiter (see ratelimit.py) and the
+circuit breaker (see circuitbreaker.py).
+"""
+import time
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import nap
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from . import instrumentation
+from .circuitbreaker import get_circuit_breaker, is_failure
+from .ratelimit import get_rate_limiter, retry_delay
+from .singleton import ProcessSingleton
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_TIMEOUT = (5, 60)
+
+# Request bodies shorter than this aren't worth gzipping.
+MIN_GZIP_LENGTH = 1024
+
+
+def get_timeout():
+    """Returns the timeout to pass to requests."""
+    return getattr(settings, 'CONSTANT_CONTACT_TIMEOUT', DEFAULT_TIMEOUT)
+
+
+def build_session():
+    """Returns a new requests.Session configured from settings.
+    """
+    pool_size = getattr(settings, 'CONSTANT_CONTACT_POOL_SIZE',
+                        DEFAULT_POOL_SIZE)
+    pool_block = getattr(settings, 'CONSTANT_CONTACT_POOL_BLOCK', False)
+    keep_alive = getattr(settings, 'CONSTANT_CONTACT_KEEP_ALIVE', True)
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1,
+                          pool_maxsize=pool_size,
+                          pool_block=pool_block)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    if not keep_alive:
+        session.headers['Connection'] = 'close'
+    return session
+
+
+# Rebuilt after a fork, so child processes never share sockets with
+# their parent.  Reset it after changing any of the pool settings.
+_session = ProcessSingleton(build_session,
+                            close=lambda session: session.close(),
+                            per_fork=True)
+get_session = _session.get
+reset_session = _session.reset
+
+
+def gzip_body(body):
+    """Returns `body` (bytes) gzipped, if settings say request bodies
+    should be and it's long enough to bother; else None.
+    """
+    if (not body or len(body) < MIN_GZIP_LENGTH or
+            not getattr(settings, 'CONSTANT_CONTACT_GZIP_REQUESTS', False)):
+        return None
+    if not isinstance(body, bytes):
+        body = body.encode('utf-8')
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(body) + compressor.flush()
+
+
+def get_hedge_after():
+    """Returns the seconds to wait before hedging a GET, or None."""
+    return getattr(settings, 'CONSTANT_CONTACT_HEDGE_AFTER', None)
+
+
+def build_hedge_executor():
+    """Returns a new pool of threads to send hedged requests from."""
+    pool_size = getattr(settings, 'CONSTANT_CONTACT_POOL_SIZE',
+                        DEFAULT_POOL_SIZE)
+    # Room for a request and its hedge per connection.
+    return ThreadPoolExecutor(max_workers=2 * pool_size)
+
+
+_hedge_executor = ProcessSingleton(
+    build_hedge_executor, close=lambda executor: executor.shutdown(wait=False),
+    per_fork=True)
+get_hedge_executor = _hedge_executor.get
+reset_hedge_executor = _hedge_executor.reset
+
+
+def hedged_request(session, method, url, hedge_after, **kwargs):
+    """Sends a request; if there's no response within `hedge_after`
+    seconds, sends it again, and returns whichever response comes
+    first.  Only for idempotent requests.
+
+    The second request is only sent if the rate limiter can spare it
+    right away.  If both fail, the first one's exception is raised.
+    The losing response is closed when it comes, so its connection
+    goes back to the pool.
+    """
+    executor = get_hedge_executor()
+    first = executor.submit(session.request, method, url, **kwargs)
+    done, _ = wait([first], timeout=hedge_after)
+    rate_limiter = get_rate_limiter()
+    if done or (rate_limiter and rate_limiter.reserve()):
+        return first.result()
+
+    futures = [first, executor.submit(session.request, method, url,
+                                      **kwargs)]
+    pending = futures
+    errors = []
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                for loser in futures:
+                    if loser is not future:
+                        loser.add_done_callback(close_response)
+                return future.result()
+            errors.append(future.exception())
+    raise errors[0]
+
+
+def close_response(future):
+    """Closes the response of a finished request, if it got one."""
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+class SessionUrl(nap.url.Url):
+    """A nap Url that sends its requests through a pooled session.
+    """
+
+    def __init__(self, base_url, session=None, **default_kwargs):
+        super(SessionUrl, self).__init__(base_url, **default_kwargs)
+        self._session = session
+
+    @property
+    def session(self):
+        return self._session or get_session()
+
+    def default_kwargs(self):
+        kwargs = {'timeout': get_timeout()}
+        kwargs.update(self._default_kwargs)
+        return kwargs
+
+    def _request(self, http_method, relative_url='', **kwargs):
+        """Like nap's _request(), but via self.session, throttled by
+        the rate limiter, with retries (see ratelimit.py), failing
+        fast while the endpoint's circuit is open (see
+        circuitbreaker.py), and with the body gzipped if settings say
+        so (see gzip_body()).
+        """
+        relative_url = self._remove_leading_slash(relative_url)
+
+        new_kwargs = self.default_kwargs().copy()
+        custom_kwargs = self.before_request(http_method,
+                                            relative_url,
+                                            kwargs.copy())
+        # Unlike nap, add to the default query params, don't replace them.
+        if 'params' in custom_kwargs:
+            params = dict(new_kwargs.get('params') or {})
+            params.update(custom_kwargs.pop('params') or {})
+            new_kwargs['params'] = params
+        new_kwargs.update(custom_kwargs)
+        gzipped = gzip_body(new_kwargs.get('data'))
+        if gzipped is not None:
+            new_kwargs['data'] = gzipped
+            new_kwargs['headers'] = dict(new_kwargs.get('headers') or {},
+                                         **{'Content-Encoding': 'gzip'})
+
+        url = self._join_url(relative_url)
+        endpoint = instrumentation.endpoint(url)
+        circuit_breaker = get_circuit_breaker()
+        attempt = 0
+        while True:
+            if circuit_breaker:
+                circuit_breaker.allow(endpoint)
+            recorded = False
+            try:
+                rate_limiter = get_rate_limiter()
+                if rate_limiter:
+                    rate_limiter.acquire()
+                request_bytes = len(new_kwargs.get('data') or '')
+                with instrumentation.timed(
+                        'http', method=http_method, endpoint=endpoint,
+                        request_bytes=request_bytes) as tags:
+                    try:
+                        response = self.send(http_method, url, **new_kwargs)
+                    except Exception:
+                        recorded = True
+                        if circuit_breaker:
+                            circuit_breaker.record(endpoint, failed=True)
+                        raise
+                    recorded = True
+                    if circuit_breaker:
+                        circuit_breaker.record(
+                            endpoint,
+                            failed=is_failure(response.status_code))
+                    tags['status_code'] = response.status_code
+                    tags['response_bytes'] = len(response.content)
+            finally:
+                if circuit_breaker and not recorded:
+                    circuit_breaker.release(endpoint)
+            delay = retry_delay(http_method, response.status_code,
+                                response.headers, attempt)
+            if delay is None:
+                break
+            time.sleep(delay)
+            attempt += 1
+
+        return self.after_request(response)
+
+    def send(self, http_method, url, **kwargs):
+        """Sends one request: hedged (see hedged_request()) if it's a
+        GET and settings.CONSTANT_CONTACT_HEDGE_AFTER is set.
+        """
+        hedge_after = get_hedge_after()
+        if hedge_after is None or http_method.upper() != 'GET':
+            return self.session.request(http_method, url, **kwargs)
+        return hedged_request(self.session, http_method, url, hedge_after,
+                              **kwargs)
+
+    def _new_url(self, relative_url):
+        """Keep the session (and class) when joining urls."""
+        return self.__class__(self._join_url(relative_url),
+                              session=self._session,
+                              **self._default_kwargs)
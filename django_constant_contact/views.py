@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""A receiver for Constant Contact webhook (and callback) notifications.
+
+Include django_constant_contact.urls in your URLconf, and register the
+webhook URL with Constant Contact:
+
+    url(r'^constant-contact/', include('django_constant_contact.urls')),
+
+Each notification is verified against its X-Ctct-Hmac-SHA256 header (a
+base64 HMAC-SHA256 of the body, keyed with
+settings.CONSTANT_CONTACT_WEBHOOK_SECRET), then the changed campaign
+fields it carries are merged into the matching EmailMarketingCampaign,
+so campaigns stay current without polling the API.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import re
+
+from django.conf import settings
+from django.http import (HttpResponseBadRequest, HttpResponseForbidden,
+                         JsonResponse)
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+from .instrumentation import timed
+from .models import EmailMarketingCampaign
+
+logger = logging.getLogger(__name__)
+
+SIGNATURE_HEADER = 'HTTP_X_CTCT_HMAC_SHA256'
+
+# Keys of a notification that aren't campaign fields.
+NOTIFICATION_KEYS = ('id', 'campaign_id', 'url', 'event_type')
+
+_CAMPAIGN_URL = re.compile(r'emailmarketing/campaigns/(\d+)')
+
+
+def signature(body, secret):
+    """Returns the signature Constant Contact sends with `body`."""
+    digest = hmac.new(secret.encode('utf-8'), body, hashlib.sha256).digest()
+    return base64.b64encode(digest).decode('ascii')
+
+
+def verify_signature(request):
+    """Was `request` signed with settings.CONSTANT_CONTACT_WEBHOOK_SECRET?
+    """
+    secret = getattr(settings, 'CONSTANT_CONTACT_WEBHOOK_SECRET', None)
+    if not secret:
+        logger.error('CONSTANT_CONTACT_WEBHOOK_SECRET is not set; '
+                     'refusing webhook notifications.')
+        return False
+    return constant_time_compare(signature(request.body, secret),
+                                 request.META.get(SIGNATURE_HEADER, ''))
+
+
+def campaign_changes(notification):
+    """Returns the changed campaign fields in `notification`, with the
+    campaign's `id`, or None if it doesn't change a campaign.
+
+    The campaign is identified by `campaign_id`, `id`, or a campaign
+    `url`.
+    """
+    campaign_id = notification.get('campaign_id') or notification.get('id')
+    if not campaign_id:
+        match = _CAMPAIGN_URL.search(notification.get('url') or '')
+        campaign_id = match and match.group(1)
+    changes = dict((key, value) for key, value in notification.items()
+                   if key not in NOTIFICATION_KEYS)
+    if not changes or not str(campaign_id or '').isdigit():
+        return None
+    changes['id'] = str(campaign_id)
+    return changes
+
+
+@csrf_exempt
+@require_POST
+def webhook(request):
+    """Applies the notifications (a JSON object, or a list of them) in
+    a signed POST to the EmailMarketingCampaigns they change.
+    """
+    if not verify_signature(request):
+        return HttpResponseForbidden()
+    try:
+        notifications = json.loads(request.body.decode('utf-8'))
+    except ValueError:
+        return HttpResponseBadRequest()
+    if isinstance(notifications, dict):
+        notifications = [notifications]
+    if not isinstance(notifications, list):
+        return HttpResponseBadRequest()
+
+    changes = [campaign_changes(notification)
+               for notification in notifications
+               if isinstance(notification, dict)]
+    with timed('db'):
+        updated = EmailMarketingCampaign.apply_changes(
+            [change for change in changes if change])
+    return JsonResponse({'updated': updated})
@@ -19,16 +19,24 @@ setup(
     long_description=read("README.rst"),
     packages=[
         'django_constant_contact',
+        'django_constant_contact.management',
+        'django_constant_contact.management.commands',
         'django_constant_contact.migrations'
     ],
     install_requires=[
         'Django==1.9.13',
         'jsonfield==2.0.2',
         'django-htmlmin==0.9.1',
+        'futures==3.1.1; python_version < "3.0"',
         'nap==2.0.0',
         'premailer==3.0.1',
         'requests==2.9.1',
     ],
+    extras_require={
+        'async': ['aiohttp'],
+        'fastjson': ['orjson; python_version >= "3.6"',
+                     'ujson; python_version < "3.6"'],
+    },
     classifiers=[
         'Environment :: Web Environment',
         'Intended Audience :: Developers',